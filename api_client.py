@@ -1,41 +1,92 @@
 import requests
 import os
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Tuple
+from api_recording import Recorder, Replayer
 
 API_KEY = os.getenv("FOOTBALL_DATA_API_KEY")
-BASE_URL = "https://api.football-data.org/v4"
+BASE_URL = os.getenv("FOOTBALL_DATA_BASE_URL", "https://api.football-data.org/v4")
+
+# live: call the API. record: call the API and save every response. replay: serve saved responses offline.
+API_MODE = os.getenv("FOOTBALL_DATA_MODE", "live")
+RECORD_FILE = os.getenv("FOOTBALL_DATA_RECORD_FILE", "./recordings/football_data.jsonl")
+REPLAY_SPEED = float(os.getenv("FOOTBALL_DATA_REPLAY_SPEED", "1"))
+REPLAY_START = os.getenv("FOOTBALL_DATA_REPLAY_START")  # ISO timestamp, defaults to the first recording
+
+_recorder: Optional[Recorder] = None
+_replayer: Optional[Replayer] = None
+
+def _get_replayer() -> Replayer:
+    global _replayer
+    if _replayer is None:
+        start = None
+        if REPLAY_START:
+            # Recordings use naive UTC; an offset (e.g. the API's trailing Z) is converted to match
+            start = datetime.fromisoformat(REPLAY_START.replace('Z', '+00:00'))
+            if start.tzinfo:
+                start = start.astimezone(timezone.utc).replace(tzinfo=None)
+        _replayer = Replayer(RECORD_FILE, speed=REPLAY_SPEED, start=start)
+    return _replayer
+
+def _get_recorder() -> Recorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = Recorder(RECORD_FILE)
+    return _recorder
+
+def utcnow() -> datetime:
+    """Current time in naive UTC, following the replay clock when replaying."""
+    if API_MODE == "replay":
+        return _get_replayer().clock()
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def time_scale() -> float:
+    """How much faster than real time the clock runs (for scaling sleeps)."""
+    return REPLAY_SPEED if API_MODE == "replay" else 1.0
+
+def _get(path: str) -> Tuple[int, Dict]:
+    """GET an API path, honouring record/replay mode. Returns (status code, JSON body or text)."""
+    if API_MODE == "replay":
+        recorded = _get_replayer().response(path)
+        if recorded is None:
+            raise Exception(f"No recorded response for {path} in {RECORD_FILE}")
+        return recorded
+
+    headers = {"X-Auth-Token": API_KEY}
+    response = requests.get(f"{BASE_URL}{path}", headers=headers, timeout=10)
+    try:
+        body = response.json()
+    except ValueError:
+        body = response.text
+    if API_MODE == "record":
+        _get_recorder().record(path, response.status_code, body)
+    return response.status_code, body
 
 def get_pl_fixtures() -> List[Dict]:
     """Fetch Premier League fixtures for the current season."""
-    if not API_KEY:
+    if not API_KEY and API_MODE != "replay":
         raise Exception("FOOTBALL_DATA_API_KEY environment variable is not set")
-        
-    headers = {"X-Auth-Token": API_KEY}
-    url = f"{BASE_URL}/competitions/PL/matches"
-    
+
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            matches = response.json().get("matches", [])
+        status_code, body = _get("/competitions/PL/matches")
+        if status_code == 200:
+            matches = body.get("matches", [])
             if not matches:
                 raise Exception("API returned 200 OK but the 'matches' list is empty. This could mean the competition ID is wrong or no matches are scheduled.")
             return matches
         else:
-            raise Exception(f"API Error {response.status_code}: {response.text}")
+            raise Exception(f"API Error {status_code}: {body}")
     except requests.exceptions.RequestException as e:
         raise Exception(f"Connection error to Football API: {str(e)}")
 
 def get_current_gameweek_number() -> int:
     """Fetch current gameweek number from competition info."""
-    if not API_KEY:
+    if not API_KEY and API_MODE != "replay":
         return 1
-    headers = {"X-Auth-Token": API_KEY}
-    url = f"{BASE_URL}/competitions/PL"
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json().get("currentSeason", {}).get("currentMatchday", 1)
+        status_code, body = _get("/competitions/PL")
+        if status_code == 200:
+            return body.get("currentSeason", {}).get("currentMatchday", 1)
     except:
         pass
     return 1
@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+def real_utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Recorder:
+    """Appends every upstream response, with the time it was received, to a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, url: str, status: int, body):
+        line = json.dumps({"recorded_at": real_utcnow().isoformat(), "url": url, "status": status, "body": body})
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+class Replayer:
+    """
+    Serves recorded responses back against a replay clock.
+
+    The clock starts at `start` (default: the first recording) and advances
+    `speed` times faster than real time, so a whole matchday recorded over an
+    afternoon can be replayed in minutes. Each request gets the latest response
+    recorded for that URL at or before the replay clock.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, start: Optional[datetime] = None):
+        self.speed = speed
+        self._responses: Dict[str, List[Tuple[datetime, int, object]]] = {}
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                recorded_at = datetime.fromisoformat(entry["recorded_at"])
+                self._responses.setdefault(entry["url"], []).append((recorded_at, entry["status"], entry["body"]))
+        for entries in self._responses.values():
+            entries.sort(key=lambda e: e[0])
+        self._times = {url: [e[0] for e in entries] for url, entries in self._responses.items()}
+
+        if start is None:
+            start = min((entries[0][0] for entries in self._responses.values()), default=real_utcnow())
+        self.origin = start
+        self._started = time.monotonic()
+
+    def clock(self) -> datetime:
+        return self.origin + timedelta(seconds=(time.monotonic() - self._started) * self.speed)
+
+    def response(self, url: str) -> Optional[Tuple[int, object]]:
+        entries = self._responses.get(url)
+        if not entries:
+            return None
+        # Before the first recording, fall back to the earliest one
+        i = max(bisect_right(self._times[url], self.clock()) - 1, 0)
+        _, status, body = entries[i]
+        return status, body
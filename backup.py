@@ -0,0 +1,157 @@
+import csv
+import io
+import json
+import os
+import sqlite3
+import subprocess
+from datetime import datetime
+from typing import Dict, Iterator, List
+from sqlalchemy import tuple_
+from sqlalchemy.engine import URL
+from sqlmodel import select
+from database import engine, SessionLocal
+from models import User, Gameweek, Fixture, Pick
+from services import pick_outcome
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "./backups")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "24"))
+
+# Pages copied per backup step. Between steps the source DB is unlocked so
+# writers (pick submissions, the fixture scheduler) are never blocked for long.
+SQLITE_BACKUP_PAGES = 256
+SQLITE_BACKUP_SLEEP = 0.005
+
+EXPORT_BATCH_SIZE = 1000
+
+def _rotate(backup_dir: str, prefix: str, keep: int):
+    """Deletes the oldest snapshots so only `keep` remain. Unfinished `.part` files don't count."""
+    snapshots = sorted(f for f in os.listdir(backup_dir) if f.startswith(prefix) and not f.endswith(".part"))
+    for old in snapshots[:-keep] if keep > 0 else []:
+        os.remove(os.path.join(backup_dir, old))
+
+def _backup_sqlite(db_path: str, dest: str):
+    tmp = dest + ".part"
+    src = sqlite3.connect(db_path)
+    dst = sqlite3.connect(tmp)
+    try:
+        src.backup(dst, pages=SQLITE_BACKUP_PAGES, sleep=SQLITE_BACKUP_SLEEP)
+    finally:
+        dst.close()
+        src.close()
+    # Only complete snapshots ever carry the final name
+    os.replace(tmp, dest)
+
+def _backup_postgres(dest: str):
+    # pg_dump reads from a single MVCC snapshot, so it never blocks writers
+    # The password goes in the environment; argv is visible to other processes via ps
+    url = URL.create("postgresql", username=engine.url.username, host=engine.url.host, port=engine.url.port,
+                     database=engine.url.database, query=engine.url.query).render_as_string(hide_password=False)
+    env = dict(os.environ)
+    if engine.url.password:
+        env["PGPASSWORD"] = engine.url.password
+    tmp = dest + ".part"
+    subprocess.run(["pg_dump", "--format=custom", f"--file={tmp}", url], check=True, env=env)
+    os.replace(tmp, dest)
+
+def backup_database(backup_dir: str = BACKUP_DIR, keep: int = BACKUP_KEEP) -> str:
+    """Takes an online snapshot of the live database and rotates old ones. Returns the snapshot path."""
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    backend = engine.url.get_backend_name()
+
+    if backend == "sqlite":
+        dest = os.path.join(backup_dir, f"lms-{stamp}.db")
+        _backup_sqlite(engine.url.database, dest)
+    elif backend == "postgresql":
+        dest = os.path.join(backup_dir, f"lms-{stamp}.dump")
+        _backup_postgres(dest)
+    else:
+        raise Exception(f"Backups are not supported for database backend '{backend}'")
+
+    _rotate(backup_dir, "lms-", keep)
+    return dest
+
+# --- Season export ---
+
+EXPORT_FIELDS = {
+    "gameweek": ["id", "deadline", "is_current", "is_processed", "re_entry_allowed", "is_rollover"],
+    "fixture": ["id", "gameweek_id", "home_team", "away_team", "kickoff_time", "status", "home_score", "away_score", "winner"],
+    "pick": ["id", "user_id", "gameweek_id", "team_name", "timestamp", "outcome"],
+    "user": ["id", "name", "is_active", "number_of_re_entries", "number_of_rollover_re_entries"],
+}
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _paged(model, order_by: List, where=None) -> Iterator:
+    """
+    Yields rows in `order_by` order (the last column must be unique) using one
+    short keyset query per page. No read stays open between pages, so a slow
+    download never holds a lock that blocks writers.
+    """
+    last = None
+    while True:
+        statement = select(model)
+        if where is not None:
+            statement = statement.where(where)
+        if last is not None:
+            statement = statement.where(tuple_(*order_by) > tuple_(*last))
+        with SessionLocal() as session:
+            rows = session.exec(statement.order_by(*order_by).limit(EXPORT_BATCH_SIZE)).all()
+            session.expunge_all()
+        if not rows:
+            return
+        yield from rows
+        last = [getattr(rows[-1], c.key) for c in order_by]
+
+def iter_season_records() -> Iterator[Dict]:
+    """
+    Yields every gameweek, fixture, pick (with its outcome) and user outcome as flat dicts.
+    Rows are read in pages rather than loaded up front.
+    """
+    for gw in _paged(Gameweek, [Gameweek.id]):
+        yield {"record_type": "gameweek", **{k: _serialize(getattr(gw, k)) for k in EXPORT_FIELDS["gameweek"]}}
+
+    for f in _paged(Fixture, [Fixture.gameweek_id, Fixture.kickoff_time, Fixture.id]):
+        yield {"record_type": "fixture", **{k: _serialize(getattr(f, k)) for k in EXPORT_FIELDS["fixture"]}}
+
+    # Picks are ordered by gameweek so only one gameweek's fixtures are held at a time
+    current_gw = None
+    team_fixtures = {}
+    for pick in _paged(Pick, [Pick.gameweek_id, Pick.user_id, Pick.id]):
+        if current_gw is None or current_gw.id != pick.gameweek_id:
+            with SessionLocal() as session:
+                current_gw = session.get(Gameweek, pick.gameweek_id)
+                team_fixtures = {}
+                for f in session.exec(select(Fixture).where(Fixture.gameweek_id == pick.gameweek_id)).all():
+                    team_fixtures[f.home_team] = f
+                    team_fixtures[f.away_team] = f
+                session.expunge_all()
+        record = {k: _serialize(getattr(pick, k)) for k in EXPORT_FIELDS["pick"] if k != "outcome"}
+        record["outcome"] = pick_outcome(pick.team_name, team_fixtures.get(pick.team_name), current_gw) if current_gw else None
+        yield {"record_type": "pick", **record}
+
+    for u in _paged(User, [User.id], where=User.is_admin == False):
+        yield {"record_type": "user", **{k: _serialize(getattr(u, k)) for k in EXPORT_FIELDS["user"]}}
+
+def iter_export_jsonl() -> Iterator[str]:
+    for record in iter_season_records():
+        yield json.dumps(record) + "\n"
+
+def iter_export_csv() -> Iterator[str]:
+    # One flat table: record_type plus the union of every record's columns
+    columns: List[str] = ["record_type"]
+    for fields in EXPORT_FIELDS.values():
+        columns += [f for f in fields if f not in columns]
+
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns)
+    writer.writeheader()
+    for record in iter_season_records():
+        writer.writerow(record)
+        if buf.tell() > 64 * 1024:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
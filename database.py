@@ -1,7 +1,12 @@
 from sqlmodel import create_engine, SQLModel, Session, text
+from datetime import datetime, timezone
 import os
+from security import pin_lookup, is_pin_lookup
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./lms.db")
+# Used for the season created when a database has none yet
+FIRST_GW_ID = int(os.getenv("FIRST_GW_ID", "24"))
+SEASON_NAME = os.getenv("SEASON_NAME")
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 
@@ -25,9 +30,35 @@ def run_migrations():
         if "number_of_rollover_re_entries" not in columns:
             conn.execute(text("ALTER TABLE user ADD COLUMN number_of_rollover_re_entries INTEGER DEFAULT 0"))
             print("Migration: Added number_of_rollover_re_entries to user table")
+
+        # Check for User.pin_hash
+        if "pin_hash" not in columns:
+            conn.execute(text("ALTER TABLE user ADD COLUMN pin_hash VARCHAR"))
+            print("Migration: Added pin_hash to user table")
+
+        # Replace plaintext PINs with their lookup digest in place (bcrypt hashes follow on first sign-in)
+        rows = conn.execute(text("SELECT id, pin FROM user")).fetchall()
+        plaintext = [{"id": user_id, "pin": pin_lookup(pin)} for user_id, pin in rows if not is_pin_lookup(pin)]
+        if plaintext:
+            conn.execute(text("UPDATE user SET pin = :pin WHERE id = :id"), plaintext)
+            print(f"Migration: Replaced {len(plaintext)} plaintext PINs with lookup digests")
+
+        # Existing data becomes the active season
+        if not conn.execute(text("SELECT 1 FROM season WHERE is_active = 1")).first():
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            conn.execute(
+                text("INSERT INTO season (name, first_gw_id, is_active, started_at) VALUES (:name, :first_gw_id, 1, :now)"),
+                {"name": SEASON_NAME or _season_label(now), "first_gw_id": FIRST_GW_ID, "now": now}
+            )
+            print("Migration: Created the active season")
         
         conn.commit()
 
+def _season_label(now: datetime) -> str:
+    """Premier League season label for a date, e.g. "2025/26"."""
+    start = now.year if now.month >= 7 else now.year - 1
+    return f"{start}/{(start + 1) % 100:02d}"
+
 def init_db():
     SQLModel.metadata.create_all(engine)
     run_migrations()
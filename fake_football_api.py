@@ -0,0 +1,135 @@
+"""
+Local stand-in for the football-data.org endpoints used by api_client.
+
+    uvicorn fake_football_api:app --port 8001
+    FOOTBALL_DATA_BASE_URL=http://localhost:8001/v4 FOOTBALL_DATA_API_KEY=fake uvicorn main:app
+
+Serves a recording made with FOOTBALL_DATA_MODE=record when FAKE_API_RECORD_FILE
+is set, otherwise a generated season whose results unfold as the clock passes
+each kickoff. Latency and a per-minute rate limit can be configured to mimic
+the real service.
+"""
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from api_recording import Replayer, real_utcnow
+
+LATENCY_MS = float(os.getenv("FAKE_API_LATENCY_MS", "0"))
+RATE_LIMIT_PER_MINUTE = int(os.getenv("FAKE_API_RATE_LIMIT", "10"))  # Free tier allows 10/min, 0 disables
+SPEED = float(os.getenv("FAKE_API_SPEED", "1"))
+RECORD_FILE = os.getenv("FAKE_API_RECORD_FILE")
+SEED = int(os.getenv("FAKE_API_SEED", "1"))
+CURRENT_MATCHDAY = int(os.getenv("FAKE_API_CURRENT_MATCHDAY", "24"))  # Matchday kicking off shortly after startup
+
+TEAMS = [
+    "Arsenal FC", "Aston Villa FC", "AFC Bournemouth", "Brentford FC", "Brighton & Hove Albion FC",
+    "Burnley FC", "Chelsea FC", "Crystal Palace FC", "Everton FC", "Fulham FC",
+    "Leeds United FC", "Liverpool FC", "Manchester City FC", "Manchester United FC", "Newcastle United FC",
+    "Nottingham Forest FC", "Sunderland AFC", "Tottenham Hotspur FC", "West Ham United FC", "Wolverhampton Wanderers FC",
+]
+MATCH_MINUTES = 110
+
+class GeneratedSeason:
+    """A deterministic 38-matchday double round robin played against an accelerated clock."""
+
+    def __init__(self, seed: int, current_matchday: int, speed: float):
+        rng = random.Random(seed)
+        self.speed = speed
+        self._started = time.monotonic()
+        # Put the current matchday's first kickoff an hour after startup
+        self.origin = real_utcnow()
+        first_kickoff = self.origin + timedelta(hours=1) - timedelta(weeks=current_matchday - 1)
+
+        rounds = self._round_robin(TEAMS)
+        rounds += [[(a, h) for h, a in r] for r in rounds]
+        self.matches: List[Dict] = []
+        match_id = 1
+        for md, pairs in enumerate(rounds, start=1):
+            day = first_kickoff + timedelta(weeks=md - 1)
+            for i, (home, away) in enumerate(pairs):
+                # Spread each matchday over two days
+                kickoff = day + timedelta(days=i // 6, hours=2 * (i % 3))
+                self.matches.append({
+                    "id": match_id,
+                    "matchday": md,
+                    "kickoff": kickoff,
+                    "homeTeam": {"name": home},
+                    "awayTeam": {"name": away},
+                    "result": (rng.choice([0, 0, 1, 1, 1, 2, 2, 3]), rng.choice([0, 0, 1, 1, 2, 2, 3])),
+                })
+                match_id += 1
+
+    @staticmethod
+    def _round_robin(teams: List[str]):
+        teams = list(teams)
+        rounds = []
+        for r in range(len(teams) - 1):
+            pairs = [(teams[i], teams[-1 - i]) for i in range(len(teams) // 2)]
+            rounds.append(pairs if r % 2 == 0 else [(a, h) for h, a in pairs])
+            teams = [teams[0], teams[-1]] + teams[1:-1]
+        return rounds
+
+    def clock(self) -> datetime:
+        return self.origin + timedelta(seconds=(time.monotonic() - self._started) * self.speed)
+
+    def _render(self, m: Dict, now: datetime) -> Dict:
+        if now < m["kickoff"]:
+            status, score = "TIMED", {"home": None, "away": None}
+        elif now < m["kickoff"] + timedelta(minutes=MATCH_MINUTES):
+            status, score = "IN_PLAY", {"home": None, "away": None}
+        else:
+            status, score = "FINISHED", {"home": m["result"][0], "away": m["result"][1]}
+        return {
+            "id": m["id"],
+            "matchday": m["matchday"],
+            "utcDate": m["kickoff"].strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "status": status,
+            "homeTeam": m["homeTeam"],
+            "awayTeam": m["awayTeam"],
+            "score": {"fullTime": score},
+        }
+
+    def response(self, url: str) -> Optional[tuple]:
+        now = self.clock()
+        matches = [self._render(m, now) for m in self.matches]
+        if url == "/competitions/PL/matches":
+            return 200, {"matches": matches}
+        if url == "/competitions/PL":
+            unfinished = [m["matchday"] for m in matches if m["status"] != "FINISHED"]
+            return 200, {"currentSeason": {"currentMatchday": min(unfinished) if unfinished else 38}}
+        return None
+
+source = Replayer(RECORD_FILE, speed=SPEED) if RECORD_FILE else GeneratedSeason(SEED, CURRENT_MATCHDAY, SPEED)
+_request_times = deque()
+
+app = FastAPI(title="Fake football-data.org")
+
+@app.get("/v4/{path:path}")
+async def serve(path: str):
+    if LATENCY_MS:
+        await asyncio.sleep(LATENCY_MS / 1000)
+
+    if RATE_LIMIT_PER_MINUTE:
+        now = time.monotonic()
+        while _request_times and now - _request_times[0] > 60:
+            _request_times.popleft()
+        if len(_request_times) >= RATE_LIMIT_PER_MINUTE:
+            reset = int(60 - (now - _request_times[0])) + 1
+            return JSONResponse(
+                status_code=429,
+                content={"message": f"You reached your request limit. Wait {reset} seconds.", "errorCode": 429},
+                headers={"X-RequestCounter-Reset": str(reset)},
+            )
+        _request_times.append(now)
+
+    result = source.response("/" + path)
+    if result is None:
+        return JSONResponse(status_code=404, content={"message": "Resource not found", "errorCode": 404})
+    status_code, body = result
+    return JSONResponse(status_code=status_code, content=body)
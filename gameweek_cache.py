@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlmodel import select
+from database import FIRST_GW_ID
+from models import Season, Gameweek, Fixture
+
+# Safety net for edits made outside the app (e.g. sqlite3 in the container);
+# in-app writers invalidate explicitly.
+CACHE_TTL_SECONDS = float(os.getenv("GAMEWEEK_CACHE_TTL", "60"))
+
+@dataclass(frozen=True)
+class SeasonInfo:
+    id: int
+    name: str
+    first_gw_id: int
+
+@dataclass(frozen=True)
+class GameweekInfo:
+    id: int
+    deadline: datetime
+    is_current: bool
+    is_processed: bool
+    re_entry_allowed: bool
+    is_rollover: bool
+
+@dataclass(frozen=True)
+class FixtureInfo:
+    id: int
+    gameweek_id: int
+    home_team: str
+    away_team: str
+    kickoff_time: datetime
+    status: str
+    home_score: Optional[int]
+    away_score: Optional[int]
+    winner: Optional[str]
+
+class GameweekContext:
+    """
+    Read-only snapshot of the active season and every gameweek and fixture,
+    with the current gameweek and a team -> fixture map per gameweek precomputed.
+    """
+
+    def __init__(self, season: Optional[SeasonInfo], gameweeks: List[GameweekInfo], fixtures: List[FixtureInfo]):
+        self.season = season
+        self.gameweeks: Dict[int, GameweekInfo] = {gw.id: gw for gw in gameweeks}
+        self.current: Optional[GameweekInfo] = next((gw for gw in gameweeks if gw.is_current), None)
+        self._fixtures: Dict[int, List[FixtureInfo]] = {}
+        self._team_fixtures: Dict[int, Dict[str, FixtureInfo]] = {}
+        for f in sorted(fixtures, key=lambda f: f.kickoff_time):
+            self._fixtures.setdefault(f.gameweek_id, []).append(f)
+            teams = self._team_fixtures.setdefault(f.gameweek_id, {})
+            # A team's first fixture of the week decides its pick
+            teams.setdefault(f.home_team, f)
+            teams.setdefault(f.away_team, f)
+        self.loaded_at = time.monotonic()
+
+    @property
+    def first_gw_id(self) -> int:
+        """Gameweek the active season's competition started in."""
+        return self.season.first_gw_id if self.season else FIRST_GW_ID
+
+    @property
+    def rollover_threshold(self) -> int:
+        """Id of the most recent rollover gameweek (0 if none); earlier picks no longer count as used."""
+        return max((gw.id for gw in self.gameweeks.values() if gw.is_rollover), default=0)
+
+    def fixtures(self, gw_id: int) -> List[FixtureInfo]:
+        """Fixtures of a gameweek ordered by kickoff."""
+        return self._fixtures.get(gw_id, [])
+
+    def all_fixtures(self) -> List[FixtureInfo]:
+        return [f for gw_id in sorted(self._fixtures) for f in self._fixtures[gw_id]]
+
+    def fixture_for(self, gw_id: int, team_name: str) -> Optional[FixtureInfo]:
+        """The fixture a team plays in a gameweek, if any."""
+        return self._team_fixtures.get(gw_id, {}).get(team_name)
+
+    def team_fixtures(self, gw_id: int) -> Dict[str, FixtureInfo]:
+        return self._team_fixtures.get(gw_id, {})
+
+_context: Optional[GameweekContext] = None
+_lock = threading.Lock()
+
+def _load(session) -> GameweekContext:
+    season = session.exec(select(Season).where(Season.is_active == True)).first()
+    season_info = SeasonInfo(id=season.id, name=season.name, first_gw_id=season.first_gw_id) if season else None
+    gameweeks = [GameweekInfo(
+        id=gw.id,
+        deadline=gw.deadline,
+        is_current=gw.is_current,
+        is_processed=gw.is_processed,
+        re_entry_allowed=gw.re_entry_allowed,
+        is_rollover=gw.is_rollover,
+    ) for gw in session.exec(select(Gameweek).order_by(Gameweek.id)).all()]
+    fixtures = [FixtureInfo(
+        id=f.id,
+        gameweek_id=f.gameweek_id,
+        home_team=f.home_team,
+        away_team=f.away_team,
+        kickoff_time=f.kickoff_time,
+        status=f.status,
+        home_score=f.home_score,
+        away_score=f.away_score,
+        winner=f.winner,
+    ) for f in session.exec(select(Fixture)).all()]
+    return GameweekContext(season_info, gameweeks, fixtures)
+
+def get_context(session) -> GameweekContext:
+    """Returns the cached context, reloading it if it was invalidated or has expired."""
+    global _context
+    with _lock:
+        if _context is None or time.monotonic() - _context.loaded_at > CACHE_TTL_SECONDS:
+            _context = _load(session)
+        return _context
+
+def invalidate():
+    """Call after committing any change to seasons, gameweeks or fixtures."""
+    global _context
+    with _lock:
+        _context = None
@@ -1,13 +1,14 @@
 from sqlmodel import Session, select
 from database import engine, init_db
 from models import User
+from security import pin_lookup, pwd_context
 
 def create_admin():
     init_db()
     with Session(engine) as session:
-        admin = session.exec(select(User).where(User.pin == "99999")).first()
+        admin = session.exec(select(User).where(User.pin == pin_lookup("99999"))).first()
         if not admin:
-            admin = User(name="Admin", pin="99999", is_active=True, is_admin=True)
+            admin = User(name="Admin", pin=pin_lookup("99999"), pin_hash=pwd_context.hash("99999"), is_active=True, is_admin=True)
             session.add(admin)
             session.commit()
             print("Admin created with PIN: 99999")
@@ -1,26 +1,34 @@
 import asyncio
 import logging
 import sys
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from jose import JWTError, jwt
-from sqlmodel import select, and_
+from sqlmodel import select, and_, or_
 
 from database import init_db, get_session
-from models import User, Gameweek, Fixture, Pick
+from models import User, UserCreate, UserRead, Season, SeasonCreate, Gameweek, Fixture, Pick, ArchivedPick, ArchivedStanding
+from security import pin_lookup, hash_pin, verify_pin, verify_dummy
 import api_client
-from services import sync_fixtures_logic
-from scheduler import fixture_scheduler_worker
+from services import sync_fixtures_logic, pick_outcome
+from user_import import import_users, PIN_LENGTH
+import simulation
+import planner
+import gameweek_cache
+import seasons
+from pick_queue import pick_queue, PendingPick, PickFlushError, PICK_INGEST_MODE
+from scheduler import fixture_scheduler_worker, backup_scheduler_worker
+from backup import backup_database, iter_export_jsonl, iter_export_csv, BACKUP_INTERVAL_HOURS
 
 # Security Constants
 SECRET_KEY = "super-secret-key-change-this"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # 1 week
-FIRST_GW_ID = 24
 
 # Configure logging to match the uvicorn style
 from uvicorn.logging import DefaultFormatter
@@ -45,6 +53,14 @@ async def on_startup():
     now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
     logger.info(f"{now} - scheduler - Fixture scheduler worker started")
     asyncio.create_task(fixture_scheduler_worker())
+    if BACKUP_INTERVAL_HOURS > 0:
+        asyncio.create_task(backup_scheduler_worker())
+    if PICK_INGEST_MODE == "queued":
+        pick_queue.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await pick_queue.stop()
 
 # --- Auth Helpers ---
 def create_access_token(data: dict):
@@ -61,48 +77,162 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        pin: str = payload.get("sub")
-        if pin is None:
+        user_id = int(payload.get("sub"))
+        pin_check: str = payload.get("pin")
+        if pin_check is None:
             raise credentials_exception
-    except JWTError:
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
     
-    user = session.exec(select(User).where(User.pin == pin)).first()
-    if user is None:
+    user = session.get(User, user_id)
+    # The token is bound to the PIN it was issued for, so changing a PIN revokes it
+    if user is None or not user.pin.startswith(pin_check):
         raise credentials_exception
     return user
 
+async def get_receipt_time():
+    # Declared before auth so deadlines are judged on arrival, not commit time
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 async def get_admin_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def _flush_pick_queue():
+    """Writes queued picks before they are read in bulk; a failed write stops the request."""
+    try:
+        await pick_queue.flush()
+    except PickFlushError as e:
+        raise HTTPException(status_code=503, detail=f"{e}; try again shortly")
+
+# --- Shared Page Data ---
+# Row shapes shared by the individual routes and the bootstrap endpoints.
+
+def _gameweek_picks(session, gw_id: int) -> Dict[int, str]:
+    """Maps user id to their team for a gameweek, in one query."""
+    return dict(session.exec(select(Pick.user_id, Pick.team_name).where(Pick.gameweek_id == gw_id)).all())
+
+def _fixture_rows(context) -> List[Dict]:
+    current_gw = context.current
+    if not current_gw:
+        return []
+    fixtures = context.fixtures(current_gw.id)
+    return [{
+        "id": f.id,
+        "home_team": f.home_team,
+        "away_team": f.away_team,
+        "kickoff_time": f.kickoff_time,
+        "status": f.status,
+        "gameweek": {
+            "id": current_gw.id,
+            "deadline": current_gw.deadline,
+            "is_rollover": current_gw.is_rollover
+        }
+    } for f in fixtures]
+
+def _standings_rows(users, current_picks: Dict[int, str]) -> List[Dict]:
+    return [{
+        "name": u.name,
+        "is_active": u.is_active,
+        "current_pick": current_picks.get(u.id)
+    } for u in users]
+
+def _history_rows(context, picks) -> List[Dict]:
+    history = []
+    for pick in picks:
+        gw = context.gameweeks.get(pick.gameweek_id)
+        if not gw: continue
+
+        # Find the fixture for this team in this gameweek
+        fixture = context.fixture_for(pick.gameweek_id, pick.team_name)
+        
+        outcome = pick_outcome(pick.team_name, fixture, gw)
+        
+        history.append({
+            "gameweek_id": pick.gameweek_id,
+            "team_name": pick.team_name,
+            "outcome": outcome,
+            "is_processed": gw.is_processed
+        })
+    return history
+
+def _admin_pick_rows(users, picks: Dict[int, str]) -> List[Dict]:
+    return [{
+        "user_id": u.id,
+        "user_name": u.name,
+        "is_active": u.is_active,
+        "team_name": picks.get(u.id)
+    } for u in users]
+
 # --- Routes ---
 
 @app.post("/login")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
     # In this app, username is ignored, password is the PIN
-    user = session.exec(select(User).where(User.pin == form_data.password)).first()
+    pin = form_data.password
+    user = session.exec(select(User).where(User.pin == pin_lookup(pin))).first()
+    user_id, lookup, pin_hash = (user.id, user.pin, user.pin_hash) if user else (None, None, None)
+    # Release the pooled connection while bcrypt runs off the event loop
+    session.close()
+
     if not user:
+        await verify_dummy(pin)
         raise HTTPException(status_code=400, detail="Invalid PIN")
+    if pin_hash:
+        if not await verify_pin(pin, pin_hash):
+            raise HTTPException(status_code=400, detail="Invalid PIN")
+    else:
+        # Migrated or bulk-imported user signing in for the first time
+        pin_hash = await hash_pin(pin)
+        user = session.get(User, user_id)
+        user.pin_hash = pin_hash
+        session.add(user)
+        session.commit()
     
-    access_token = create_access_token(data={"sub": user.pin})
+    access_token = create_access_token(data={"sub": str(user_id), "pin": lookup[:16]})
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.get("/me")
+@app.get("/me", response_model=UserRead)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # --- Admin Routes ---
 
-@app.post("/admin/users", response_model=User)
-async def create_user(user_in: User, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
-    session.add(user_in)
+@app.post("/admin/users", response_model=UserRead)
+async def create_user(user_in: UserCreate, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    if not (user_in.pin.isdigit() and len(user_in.pin) == PIN_LENGTH):
+        raise HTTPException(status_code=400, detail=f"PIN must be {PIN_LENGTH} digits")
+    lookup = pin_lookup(user_in.pin)
+    # login looks users up by PIN alone, so PINs must be unique
+    if session.exec(select(User).where(User.pin == lookup)).first():
+        raise HTTPException(status_code=400, detail="PIN already in use")
+    user = User(
+        name=user_in.name,
+        pin=lookup,
+        pin_hash=await hash_pin(user_in.pin),
+        is_active=user_in.is_active,
+        is_admin=user_in.is_admin,
+    )
+    session.add(user)
     session.commit()
-    session.refresh(user_in)
-    return user_in
+    session.refresh(user)
+    return user
 
-@app.get("/admin/users", response_model=List[User])
+@app.post("/admin/users/import")
+async def bulk_import_users(file: UploadFile = File(...), format: Optional[str] = None, generate_pins: bool = False, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Bulk-creates users from a CSV (name,pin[,is_active]) or JSONL upload."""
+    fmt = (format or (file.filename or "").rsplit(".", 1)[-1]).lower()
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Upload must be a .csv or .jsonl file")
+    try:
+        return import_users(session, file.file, fmt, generate_pins=generate_pins)
+    except ValueError as e:
+        # Drops any chunks already inserted for this upload
+        session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/admin/users", response_model=List[UserRead])
 async def list_users(admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     return session.exec(select(User)).all()
 
@@ -121,15 +251,16 @@ async def delete_user(user_id: int, admin: User = Depends(get_admin_user), sessi
     
     session.delete(user)
     session.commit()
+    pick_queue.drop_user(user_id)
     return {"message": "User deleted successfully"}
 
-@app.post("/admin/users/{user_id}/re-entry")
+@app.post("/admin/users/{user_id}/re-entry", response_model=UserRead)
 async def user_re_entry(user_id: int, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     user = session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
+    current_gw = gameweek_cache.get_context(session).current
     if not current_gw or (not current_gw.re_entry_allowed and not current_gw.is_rollover):
         raise HTTPException(status_code=400, detail="Re-entry or Rollover activation not allowed in the current gameweek")
     
@@ -152,6 +283,8 @@ async def user_re_entry(user_id: int, admin: User = Depends(get_admin_user), ses
 @app.post("/admin/sync-fixtures")
 async def sync_fixtures(admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     """Only fetches and updates fixtures and gameweek deadlines."""
+    # Live results read this week's picks, so queued ones must be written first
+    await _flush_pick_queue()
     try:
         return sync_fixtures_logic(session)
     except Exception as e:
@@ -159,9 +292,32 @@ async def sync_fixtures(admin: User = Depends(get_admin_user), session: Session
         logger.error(f"Sync error: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/admin/backup")
+async def trigger_backup(admin: User = Depends(get_admin_user)):
+    """Takes an online snapshot of the database without blocking writers."""
+    try:
+        path = await asyncio.to_thread(backup_database)
+    except Exception as e:
+        logger.error(f"Backup error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"message": "Backup completed", "path": path}
+
+@app.get("/admin/export")
+async def export_season(format: str = "jsonl", admin: User = Depends(get_admin_user)):
+    """Streams gameweeks, fixtures, picks and user outcomes as JSONL or CSV."""
+    if format == "jsonl":
+        return StreamingResponse(iter_export_jsonl(), media_type="application/x-ndjson",
+                                 headers={"Content-Disposition": "attachment; filename=season.jsonl"})
+    if format == "csv":
+        return StreamingResponse(iter_export_csv(), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=season.csv"})
+    raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+
 @app.post("/admin/apply-results/{gw_id}")
 async def apply_results(gw_id: int, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     """Resolves results for a specific gameweek."""
+    # Queued picks must be in the database before they are resolved
+    await _flush_pick_queue()
     gw = session.get(Gameweek, gw_id)
     if not gw:
         raise HTTPException(status_code=404, detail="Gameweek not found")
@@ -170,7 +326,8 @@ async def apply_results(gw_id: int, admin: User = Depends(get_admin_user), sessi
         raise HTTPException(status_code=400, detail="Gameweek already processed")
 
     # Check if all fixtures are finished or postponed
-    fixtures = session.exec(select(Fixture).where(Fixture.gameweek_id == gw.id)).all()
+    context = gameweek_cache.get_context(session)
+    fixtures = context.fixtures(gw.id)
     all_finalized = all(f.status in ['FINISHED', 'POSTPONED', 'CANCELLED'] for f in fixtures)
     
     if not all_finalized:
@@ -187,7 +344,7 @@ async def apply_results(gw_id: int, admin: User = Depends(get_admin_user), sessi
         if not user or not user.is_active or user.is_admin: continue
         
         # Find the fixture for this team
-        fixture = next((f for f in fixtures if f.home_team == pick.team_name or f.away_team == pick.team_name), None)
+        fixture = context.fixture_for(gw.id, pick.team_name)
         
         if not fixture:
             continue
@@ -216,7 +373,7 @@ async def apply_results(gw_id: int, admin: User = Depends(get_admin_user), sessi
         next_gw.is_current = True
         
         # Calculate the correct deadline for the new week (skip out-of-turn games)
-        unplayed = [f for f in next_gw.fixtures if f.status not in ['FINISHED', 'POSTPONED', 'CANCELLED']]
+        unplayed = [f for f in context.fixtures(next_gw.id) if f.status not in ['FINISHED', 'POSTPONED', 'CANCELLED']]
         if unplayed:
             next_gw.deadline = min(f.kickoff_time for f in unplayed)
             
@@ -227,6 +384,7 @@ async def apply_results(gw_id: int, admin: User = Depends(get_admin_user), sessi
     rollover_needed = len(remaining_active) == 0
 
     session.commit()
+    gameweek_cache.invalidate()
     
     return {
         "message": f"Gameweek {gw_id} processed successfully. Rolled over to GW {gw_id + 1 if next_gw else gw_id}.",
@@ -243,8 +401,58 @@ async def trigger_rollover(gw_id: int, admin: User = Depends(get_admin_user), se
     session.add(gw)
     
     session.commit()
+    gameweek_cache.invalidate()
     return {"message": f"Rollover triggered for Gameweek {gw_id}. Please manually re-activate players who have bought back in."}
 
+@app.post("/admin/seasons/archive")
+async def archive_season(next_season: SeasonCreate, force: bool = False, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Archives the active season and starts next_season with empty gameweek, fixture and pick tables."""
+    # Picks acknowledged by the queue must be in the table before it is archived
+    await _flush_pick_queue()
+    try:
+        result = seasons.archive_season(session, next_season, force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    pick_queue.reset()
+    return result
+
+@app.get("/admin/simulation")
+async def get_simulation(n_sims: int = 100000, seed: Optional[int] = None, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Monte Carlo survival/win probabilities for every active player using the default strength model."""
+    return await _simulate(session, n_sims, seed)
+
+@app.post("/admin/simulation")
+async def run_custom_simulation(probabilities: Dict[int, Any], n_sims: int = 100000, seed: Optional[int] = None, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Same as GET, but with per-fixture [home, draw, away] probabilities overriding the strength model."""
+    # Values are checked by validate_overrides so every malformed one gets the same 400
+    return await _simulate(session, n_sims, seed, probabilities)
+
+async def _simulate(session, n_sims, seed, overrides=None):
+    if not 1 <= n_sims <= 1000000:
+        raise HTTPException(status_code=400, detail="n_sims must be between 1 and 1,000,000")
+    try:
+        state = simulation.load_season_state(session, gameweek_cache.get_context(session).first_gw_id, overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if state is None:
+        raise HTTPException(status_code=400, detail="No active gameweek")
+
+    key = simulation.cache_key(state, n_sims, seed)
+    result = simulation.get_cached_simulation(key)
+    if result is None:
+        # NumPy releases the GIL, so running in a thread keeps the event loop responsive
+        result = await asyncio.to_thread(simulation.run_simulation, state, n_sims, seed)
+        simulation.store_simulation(key, result)
+    return result
+
+@app.get("/admin/plans")
+async def get_admin_plans(admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Maximum-survival pick plan for every active player."""
+    state = simulation.load_season_state(session, gameweek_cache.get_context(session).first_gw_id)
+    if state is None:
+        raise HTTPException(status_code=400, detail="No active gameweek")
+    return planner.plan_for_users(state, simulation.build_tables(state))
+
 @app.get("/admin/gameweeks")
 async def get_gameweeks(admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     return session.exec(select(Gameweek).order_by(Gameweek.id)).all()
@@ -256,33 +464,31 @@ async def get_gw_fixtures(gw_id: int, admin: User = Depends(get_admin_user), ses
 @app.get("/admin/picks/{gw_id}")
 async def get_admin_picks(gw_id: int, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
     users = session.exec(select(User).where(User.is_admin == False)).all()
-    picks = session.exec(select(Pick).where(Pick.gameweek_id == gw_id)).all()
-    picks_map = {p.user_id: p for p in picks}
-    
-    results = []
-    for u in users:
-        results.append({
-            "user_id": u.id,
-            "user_name": u.name,
-            "is_active": u.is_active,
-            "team_name": picks_map[u.id].team_name if u.id in picks_map else None
-        })
-    return results
+    return _admin_pick_rows(users, _gameweek_picks(session, gw_id))
+
+@app.get("/admin/bootstrap")
+@app.get("/admin/bootstrap/{gw_id}")
+async def get_admin_bootstrap(gw_id: Optional[int] = None, admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
+    """Users, gameweeks and a gameweek's fixtures and picks (the current one if gw_id is omitted) for admin.html."""
+    context = gameweek_cache.get_context(session)
+    if gw_id is None:
+        gw_id = context.current.id if context.current else min(context.gameweeks, default=None)
+    users = session.exec(select(User)).all()
+    picks = _gameweek_picks(session, gw_id) if gw_id is not None else {}
+    return {
+        "users": [UserRead.model_validate(u) for u in users],
+        "gameweeks": list(context.gameweeks.values()),
+        "gw_id": gw_id,
+        "fixtures": context.fixtures(gw_id),
+        "picks": _admin_pick_rows([u for u in users if not u.is_admin], picks)
+    }
 
 @app.post("/admin/picks/{gw_id}/batch")
 async def batch_update_admin_picks(gw_id: int, picks_in: List[dict], admin: User = Depends(get_admin_user), session: Session = Depends(get_session)):
-    # Get all fixtures for this GW to validate teams
-    fixtures = session.exec(select(Fixture).where(Fixture.gameweek_id == gw_id)).all()
-    valid_teams = set()
-    for f in fixtures:
-        valid_teams.add(f.home_team)
-        valid_teams.add(f.away_team)
-
-    # Map team names to their fixtures
-    team_fixtures = {}
-    for f in fixtures:
-        team_fixtures[f.home_team] = f
-        team_fixtures[f.away_team] = f
+    # Write queued player picks first so a later flush can't undo the admin's change
+    await _flush_pick_queue()
+    # Map team names to their fixtures for this GW to validate teams
+    team_fixtures = gameweek_cache.get_context(session).team_fixtures(gw_id)
 
     for p in picks_in:
         user_id = p.get('user_id')
@@ -315,58 +521,64 @@ async def batch_update_admin_picks(gw_id: int, picks_in: List[dict], admin: User
                 session.add(new_pick)
     
     session.commit()
+    pick_queue.reset()
     return {"message": "Picks updated successfully"}
 
 # --- Player Routes ---
 
 @app.get("/fixtures")
 async def get_current_fixtures(session: Session = Depends(get_session)):
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
-    if not current_gw:
-        return []
-    fixtures = session.exec(select(Fixture).where(Fixture.gameweek_id == current_gw.id).order_by(Fixture.kickoff_time)).all()
-    return [{
-        "id": f.id,
-        "home_team": f.home_team,
-        "away_team": f.away_team,
-        "kickoff_time": f.kickoff_time,
-        "status": f.status,
-        "gameweek": {
-            "id": current_gw.id,
-            "deadline": current_gw.deadline,
-            "is_rollover": current_gw.is_rollover
-        }
-    } for f in fixtures]
+    return _fixture_rows(gameweek_cache.get_context(session))
+
+@app.get("/player/bootstrap")
+async def get_player_bootstrap(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """What /me, /fixtures, /standings and /history return, in one response for player.html."""
+    context = gameweek_cache.get_context(session)
+    current_gw = context.current
+    users = session.exec(select(User).where(User.is_admin == False)).all()
+
+    # One query covers everyone's current pick and the player's own history
+    condition = Pick.user_id == current_user.id
+    if current_gw:
+        condition = or_(condition, Pick.gameweek_id == current_gw.id)
+    picks = session.exec(select(Pick).where(condition).order_by(Pick.gameweek_id)).all()
+    current_picks = {p.user_id: p.team_name for p in picks if current_gw and p.gameweek_id == current_gw.id}
+
+    return {
+        "me": UserRead.model_validate(current_user),
+        "fixtures": _fixture_rows(context),
+        "standings": _standings_rows(users, current_picks),
+        "history": _history_rows(context, [p for p in picks if p.user_id == current_user.id])
+    }
 
 @app.post("/picks")
-async def make_pick(team_name: str, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+async def make_pick(team_name: str, received_at: datetime = Depends(get_receipt_time), current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="You are eliminated")
     
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
+    context = gameweek_cache.get_context(session)
+    current_gw = context.current
     if not current_gw:
         raise HTTPException(status_code=400, detail="No active gameweek")
     
-    if datetime.now(timezone.utc).replace(tzinfo=None) > current_gw.deadline:
+    if received_at > current_gw.deadline:
         raise HTTPException(status_code=400, detail="Deadline passed")
     
     # Rollover logic: only check picks after the most recent rollover gameweek
-    latest_rollover_gw = session.exec(
-        select(Gameweek)
-        .where(Gameweek.is_rollover == True)
-        .order_by(Gameweek.id.desc())
-    ).first()
-    
-    rollover_threshold_id = latest_rollover_gw.id if latest_rollover_gw else 0
+    rollover_threshold_id = context.rollover_threshold
+    first_gw_id = context.first_gw_id
 
     # Check if team already used
-    if current_user.number_of_re_entries > 0:
-        # Re-entry: ignore the pick from the first week (Week 24)
+    if PICK_INGEST_MODE == "queued":
+        # Answered from the queue's in-memory index, including picks not yet written
+        prev_pick = pick_queue.is_team_used(session, current_user, team_name, rollover_threshold_id, first_gw_id)
+    elif current_user.number_of_re_entries > 0:
+        # Re-entry: ignore the pick from the season's first week
         # AND only consider picks after the latest rollover
         prev_pick = session.exec(select(Pick).where(and_(
             Pick.user_id == current_user.id,
             Pick.team_name == team_name,
-            Pick.gameweek_id != FIRST_GW_ID,
+            Pick.gameweek_id != first_gw_id,
             Pick.gameweek_id >= rollover_threshold_id
         ))).first()
     else:
@@ -381,28 +593,42 @@ async def make_pick(team_name: str, current_user: User = Depends(get_current_use
         raise HTTPException(status_code=400, detail="Team already used since last rollover")
     
     # Check if the team's match for this gameweek has already started/concluded
-    fixture = session.exec(select(Fixture).where(and_(
-        Fixture.gameweek_id == current_gw.id,
-        (Fixture.home_team == team_name) | (Fixture.away_team == team_name)
-    ))).first()
+    fixture = context.fixture_for(current_gw.id, team_name)
     
     if not fixture:
         raise HTTPException(status_code=400, detail="Invalid team selection")
     
-    if datetime.now(timezone.utc).replace(tzinfo=None) > fixture.kickoff_time:
+    if received_at > fixture.kickoff_time:
         raise HTTPException(status_code=400, detail=f"Match for {team_name} has already started")
 
+    if PICK_INGEST_MODE == "queued":
+        pick_queue.submit(PendingPick(user_id=current_user.id, gameweek_id=current_gw.id, team_name=team_name, received_at=received_at))
+        # Nothing to commit, so hand the pooled connection back before the response is sent
+        session.close()
+        return {"message": "Pick received", "received_at": received_at}
+
     # Upsert pick
     existing_pick = session.exec(select(Pick).where(and_(Pick.user_id == current_user.id, Pick.gameweek_id == current_gw.id))).first()
     if existing_pick:
         existing_pick.team_name = team_name
-        existing_pick.timestamp = datetime.now(timezone.utc).replace(tzinfo=None)
+        existing_pick.timestamp = received_at
     else:
-        new_pick = Pick(user_id=current_user.id, gameweek_id=current_gw.id, team_name=team_name)
+        new_pick = Pick(user_id=current_user.id, gameweek_id=current_gw.id, team_name=team_name, timestamp=received_at)
         session.add(new_pick)
     
     session.commit()
-    return {"message": "Pick saved"}
+    return {"message": "Pick saved", "received_at": received_at}
+
+@app.get("/plan")
+async def get_pick_plan(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """The player's maximum-survival plan for their remaining gameweeks."""
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="You are eliminated")
+    state = simulation.load_season_state(session, gameweek_cache.get_context(session).first_gw_id, user_id=current_user.id)
+    if state is None:
+        raise HTTPException(status_code=400, detail="No active gameweek")
+    plans = planner.plan_for_users(state, simulation.build_tables(state))
+    return plans[0] if plans else None
 
 @app.get("/public/gameweeks")
 async def get_public_gameweeks(session: Session = Depends(get_session)):
@@ -415,27 +641,18 @@ async def get_public_fixtures(gw_id: int, session: Session = Depends(get_session
 @app.get("/public/standings")
 async def get_public_standings(session: Session = Depends(get_session)):
     users = session.exec(select(User).where(User.is_admin == False)).all()
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
+    current_gw = gameweek_cache.get_context(session).current
     
     total_re_entries = sum(u.number_of_re_entries for u in users)
     total_rollover_re_entries = sum(u.number_of_rollover_re_entries for u in users)
     
-    results = []
-    for u in users:
-        pick = None
-        if current_gw:
-            pick_obj = session.exec(select(Pick).where(and_(Pick.user_id == u.id, Pick.gameweek_id == current_gw.id))).first()
-            if pick_obj:
-                # Always show all picks for this week
-                pick = pick_obj.team_name
-        
-        results.append({
-            "name": u.name,
-            "is_active": u.is_active,
-            "current_pick": pick,
-            "re_entries": u.number_of_re_entries,
-            "rollover_re_entries": u.number_of_rollover_re_entries
-        })
+    # Always show all picks for this week
+    current_picks = _gameweek_picks(session, current_gw.id) if current_gw else {}
+    results = [{
+        **row,
+        "re_entries": u.number_of_re_entries,
+        "rollover_re_entries": u.number_of_rollover_re_entries
+    } for u, row in zip(users, _standings_rows(users, current_picks))]
     return {
         "gw_id": current_gw.id if current_gw else None,
         "standings": results,
@@ -446,60 +663,49 @@ async def get_public_standings(session: Session = Depends(get_session)):
 @app.get("/standings")
 async def get_standings(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     users = session.exec(select(User).where(User.is_admin == False)).all()
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
-    
-    results = []
-    for u in users:
-        pick = None
-        if current_gw:
-            pick_obj = session.exec(select(Pick).where(and_(Pick.user_id == u.id, Pick.gameweek_id == current_gw.id))).first()
-            if pick_obj:
-                # Always show own pick, show others only if deadline passed
-                # Always show all picks for this week
-                pick = pick_obj.team_name
-        
-        results.append({
-            "name": u.name,
-            "is_active": u.is_active,
-            "current_pick": pick
-        })
-    return results
+    current_gw = gameweek_cache.get_context(session).current
+    # Always show all picks for this week
+    current_picks = _gameweek_picks(session, current_gw.id) if current_gw else {}
+    return _standings_rows(users, current_picks)
 
 @app.get("/history")
 async def get_user_history(current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     # Get all picks for the user, ordered by gameweek
     picks = session.exec(select(Pick).where(Pick.user_id == current_user.id).order_by(Pick.gameweek_id)).all()
-    
-    history = []
-    for pick in picks:
-        gw = session.get(Gameweek, pick.gameweek_id)
-        if not gw: continue
+    return _history_rows(gameweek_cache.get_context(session), picks)
 
-        # Find the fixture for this team in this gameweek
-        fixture = session.exec(select(Fixture).where(
-            and_(
-                Fixture.gameweek_id == pick.gameweek_id,
-                (Fixture.home_team == pick.team_name) | (Fixture.away_team == pick.team_name)
-            )
-        )).first()
-        
-        outcome = "Pending"
-        if fixture:
-            if fixture.status == 'FINISHED':
-                outcome = "WON" if fixture.winner == pick.team_name else "LOST"
-            elif fixture.status in ['POSTPONED', 'CANCELLED']:
-                outcome = "THROUGH (Postponed)" if gw.is_processed else "POSTPONED"
-            elif fixture.status == 'IN_PLAY':
-                outcome = "In Play"
-        
-        history.append({
-            "gameweek_id": pick.gameweek_id,
-            "team_name": pick.team_name,
-            "outcome": outcome,
-            "is_processed": gw.is_processed
-        })
-    
-    return history
+# --- Past Seasons ---
+
+@app.get("/public/seasons")
+async def get_seasons(session: Session = Depends(get_session)):
+    return session.exec(select(Season).order_by(Season.id)).all()
+
+@app.get("/public/seasons/{season_id}/standings")
+async def get_season_standings(season_id: int, session: Session = Depends(get_session)):
+    if not session.get(Season, season_id):
+        raise HTTPException(status_code=404, detail="Season not found")
+    standings = session.exec(select(ArchivedStanding).where(ArchivedStanding.season_id == season_id).order_by(ArchivedStanding.name)).all()
+    return [{
+        "name": s.name,
+        "is_active": s.is_active,
+        "re_entries": s.re_entries,
+        "rollover_re_entries": s.rollover_re_entries,
+        "picks_made": s.picks_made,
+        "last_gw_id": s.last_gw_id
+    } for s in standings]
+
+@app.get("/seasons/{season_id}/history")
+async def get_season_history(season_id: int, current_user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    """The player's picks from an archived season, in the same shape as /history."""
+    picks = session.exec(select(ArchivedPick).where(and_(
+        ArchivedPick.season_id == season_id,
+        ArchivedPick.user_id == current_user.id
+    )).order_by(ArchivedPick.gameweek_id)).all()
+    return [{
+        "gameweek_id": p.gameweek_id,
+        "team_name": p.team_name,
+        "outcome": p.outcome
+    } for p in picks]
 
 # Serve static files (Frontend)
 app.mount("/", StaticFiles(directory="frontend", html=True), name="frontend")
@@ -5,7 +5,8 @@ from sqlmodel import Field, Relationship, SQLModel
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
-    pin: str = Field(index=True)  # 5 digit PIN
+    pin: str = Field(index=True)  # Keyed lookup digest of the 5 digit PIN (security.pin_lookup), never the PIN itself
+    pin_hash: Optional[str] = None  # bcrypt hash of the PIN, set on creation or first sign-in
     is_active: bool = Field(default=True)
     is_admin: bool = Field(default=False)
     number_of_re_entries: int = Field(default=0)
@@ -13,6 +14,33 @@ class User(SQLModel, table=True):
 
     picks: List["Pick"] = Relationship(back_populates="user")
 
+class UserCreate(SQLModel):
+    name: str
+    pin: str  # Plain 5 digit PIN, only ever stored hashed
+    is_active: bool = True
+    is_admin: bool = False
+
+class UserRead(SQLModel):
+    """User as returned by the API, without PIN material."""
+    id: int
+    name: str
+    is_active: bool
+    is_admin: bool
+    number_of_re_entries: int
+    number_of_rollover_re_entries: int
+
+class Season(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str  # e.g. "2025/26"
+    first_gw_id: int  # Gameweek the competition starts in
+    is_active: bool = Field(default=True)  # Only the active season lives in the gameweek/fixture/pick tables
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+    archived_at: Optional[datetime] = None
+
+class SeasonCreate(SQLModel):
+    name: str
+    first_gw_id: int
+
 class Gameweek(SQLModel, table=True):
     id: int = Field(primary_key=True)  # Using the sequence number (e.g., 1, 2, 3...)
     deadline: datetime
@@ -46,3 +74,48 @@ class Pick(SQLModel, table=True):
 
     user: User = Relationship(back_populates="picks")
     gameweek: Gameweek = Relationship(back_populates="picks")
+
+# --- Season archive ---
+# Written once by seasons.archive_season and read-only afterwards. User ids are
+# kept without foreign keys so deleting a player doesn't touch past seasons.
+
+class ArchivedGameweek(SQLModel, table=True):
+    __tablename__ = "archived_gameweek"
+    season_id: int = Field(foreign_key="season.id", primary_key=True)
+    id: int = Field(primary_key=True)
+    deadline: datetime
+    re_entry_allowed: bool = False
+    is_rollover: bool = False
+
+class ArchivedFixture(SQLModel, table=True):
+    __tablename__ = "archived_fixture"
+    season_id: int = Field(foreign_key="season.id", primary_key=True)
+    id: int = Field(primary_key=True)  # External API ID
+    gameweek_id: int
+    home_team: str
+    away_team: str
+    kickoff_time: datetime
+    status: str
+    home_score: Optional[int] = None
+    away_score: Optional[int] = None
+    winner: Optional[str] = None
+
+class ArchivedPick(SQLModel, table=True):
+    __tablename__ = "archived_pick"
+    season_id: int = Field(foreign_key="season.id", primary_key=True)
+    user_id: int = Field(primary_key=True)
+    gameweek_id: int = Field(primary_key=True)
+    team_name: str
+    outcome: str  # services.pick_outcome at archive time
+    timestamp: datetime
+
+class ArchivedStanding(SQLModel, table=True):
+    __tablename__ = "archived_standing"
+    season_id: int = Field(foreign_key="season.id", primary_key=True)
+    user_id: int = Field(primary_key=True)
+    name: str  # Name at archive time
+    is_active: bool  # Still standing when the season was archived
+    re_entries: int = 0
+    rollover_re_entries: int = 0
+    picks_made: int = 0
+    last_gw_id: Optional[int] = None  # Gameweek of the player's last pick
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlmodel import select
+from database import SessionLocal
+from models import Pick
+
+logger = logging.getLogger(__name__)
+
+# direct: every POST /picks commits on its own. queued: picks are acknowledged
+# from memory and group-committed by a background flusher.
+PICK_INGEST_MODE = os.getenv("PICK_INGEST_MODE", "direct")
+FLUSH_INTERVAL_MS = float(os.getenv("PICK_FLUSH_INTERVAL_MS", "5"))
+MAX_BATCH_SIZE = 1000
+RETRY_DELAY_SECONDS = 1
+# Failed attempts before a batch is written pick by pick and the failing ones set aside
+MAX_FLUSH_ATTEMPTS = 5
+
+class PickFlushError(Exception):
+    pass
+
+@dataclass
+class PendingPick:
+    user_id: int
+    gameweek_id: int
+    team_name: str
+    received_at: datetime
+
+class PickIngestQueue:
+    """
+    Accepts validated picks in memory and writes them in batches, one
+    transaction per flush. Also keeps an index of picks since the last rollover
+    (including ones not yet written) so submissions can be validated without
+    touching the database.
+    """
+
+    def __init__(self):
+        self._pending: List[PendingPick] = []
+        self._in_flight: List[PendingPick] = []
+        # Picks that could not be written even on their own; kept for inspection, never retried
+        self.failed: List[PendingPick] = []
+        self._attempts = 0
+        self._index: Optional[Dict[int, Dict[int, str]]] = None
+        self._index_threshold: Optional[int] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # --- In-memory pick index ---
+
+    def reset(self):
+        """Drops the pick index so it is reloaded; call after picks are changed outside the queue."""
+        self._index = None
+
+    def _picks_since(self, session, threshold: int) -> Dict[int, Dict[int, str]]:
+        if self._index is None or self._index_threshold != threshold:
+            index: Dict[int, Dict[int, str]] = {}
+            rows = session.exec(select(Pick.user_id, Pick.gameweek_id, Pick.team_name).where(Pick.gameweek_id >= threshold)).all()
+            for user_id, gw_id, team_name in rows:
+                index.setdefault(user_id, {})[gw_id] = team_name
+            # Picks not yet committed still count
+            for p in self._in_flight + self._pending:
+                if p.gameweek_id >= threshold:
+                    index.setdefault(p.user_id, {})[p.gameweek_id] = p.team_name
+            self._index = index
+            self._index_threshold = threshold
+        return self._index
+
+    def is_team_used(self, session, user, team_name: str, threshold: int, first_gw_id: int) -> bool:
+        """Same reuse rule as make_pick's direct path, answered from memory."""
+        for gw_id, team in self._picks_since(session, threshold).get(user.id, {}).items():
+            if team != team_name:
+                continue
+            if user.number_of_re_entries > 0 and gw_id == first_gw_id:
+                continue
+            return True
+        return False
+
+    # --- Ingest and flush ---
+
+    def drop_user(self, user_id: int):
+        """Discards a user's unwritten picks, e.g. when the user is deleted."""
+        self._pending = [p for p in self._pending if p.user_id != user_id]
+        self.reset()
+
+    def submit(self, pick: PendingPick):
+        self._pending.append(pick)
+        if self._index is not None:
+            self._index.setdefault(pick.user_id, {})[pick.gameweek_id] = pick.team_name
+        if self._wakeup:
+            self._wakeup.set()
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        # Don't lose acknowledged picks on shutdown
+        try:
+            await self.flush()
+        except PickFlushError as e:
+            logger.error(f"Picks lost on shutdown: {e}")
+
+    async def flush(self):
+        """
+        Writes everything pending now, e.g. before picks are read in bulk.
+        Raises PickFlushError on the first failed write rather than retrying in place.
+        """
+        while self._pending:
+            if not await self._flush_once():
+                raise PickFlushError(f"{len(self._pending)} queued picks could not be written")
+            # write_picks is synchronous, so give other tasks a turn between batches
+            await asyncio.sleep(0)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Let a burst accumulate so it lands in one transaction
+            await asyncio.sleep(FLUSH_INTERVAL_MS / 1000)
+            while self._pending:
+                if not await self._flush_once():
+                    await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+    async def _flush_once(self) -> bool:
+        """
+        Writes up to MAX_BATCH_SIZE pending picks in one transaction; puts them back on failure.
+        After MAX_FLUSH_ATTEMPTS failures in a row the batch is written pick by pick and
+        any pick that still fails moves to `failed`, so one bad pick can't hold up the rest.
+        """
+        batch = self._pending[:MAX_BATCH_SIZE]
+        del self._pending[:len(batch)]
+        self._in_flight = batch
+        try:
+            # Written on the event loop like every route's DB access, so the
+            # flush never contends with request sessions from another thread
+            write_picks(batch)
+            self._attempts = 0
+            return True
+        except Exception as e:
+            self._attempts += 1
+            if self._attempts < MAX_FLUSH_ATTEMPTS:
+                logger.error(f"Pick flush failed, retrying {len(batch)} picks: {e}", exc_info=True)
+                self._pending[:0] = batch
+                return False
+            logger.error(f"Pick flush failed {self._attempts} times, writing {len(batch)} picks one by one: {e}")
+            self._attempts = 0
+            for p in batch:
+                try:
+                    write_picks([p])
+                except Exception as e:
+                    logger.error(f"Setting aside pick for user {p.user_id} in gameweek {p.gameweek_id}: {e}")
+                    self.failed.append(p)
+            # Picks set aside must stop counting as used
+            self.reset()
+            return True
+        finally:
+            self._in_flight = []
+
+def write_picks(batch: List[PendingPick]):
+    """
+    Upserts a batch of picks in a single transaction. Later receipts win,
+    including over a stored pick changed since (e.g. by an admin).
+    """
+    latest: Dict[tuple, PendingPick] = {}
+    for p in sorted(batch, key=lambda p: p.received_at):
+        latest[(p.user_id, p.gameweek_id)] = p
+
+    with SessionLocal() as session:
+        user_ids = {user_id for user_id, _ in latest}
+        gw_ids = {gw_id for _, gw_id in latest}
+        existing = {
+            (p.user_id, p.gameweek_id): p
+            for p in session.exec(select(Pick).where(Pick.user_id.in_(user_ids), Pick.gameweek_id.in_(gw_ids))).all()
+        }
+        for key, p in latest.items():
+            pick = existing.get(key)
+            if pick:
+                if pick.timestamp > p.received_at:
+                    continue
+                pick.team_name = p.team_name
+                pick.timestamp = p.received_at
+            else:
+                session.add(Pick(user_id=p.user_id, gameweek_id=p.gameweek_id, team_name=p.team_name, timestamp=p.received_at))
+        session.commit()
+
+pick_queue = PickIngestQueue()
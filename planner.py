@@ -0,0 +1,68 @@
+from typing import Dict, List, Optional
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# Cost for a (gameweek, team) cell the player cannot legally pick
+INELIGIBLE_COST = 1e6
+MIN_WIN_PROB = 1e-12
+
+def plan_path(used: set, current_pick: Optional[str], team_idx: Dict[str, int], win_prob: np.ndarray, pickable: np.ndarray) -> List[int]:
+    """
+    Maximum-survival pick plan for one player.
+
+    Each remaining gameweek gets a distinct team not used since the last rollover,
+    chosen to maximise the product of win probabilities (a min-cost assignment
+    on -log p). With fewer teams left than gameweeks, the earliest weeks are planned
+    since a player must survive those first. Returns one team index per gameweek,
+    -1 where there is no legal pick.
+    """
+    G, T = win_prob.shape
+    path = [-1] * G
+    taken = {team_idx[t] for t in used if t in team_idx}
+
+    start = 0
+    if current_pick is not None:
+        # This week's pick is already in, only later weeks are planned
+        path[0] = team_idx.get(current_pick, -1)
+        taken.add(path[0])
+        start = 1
+
+    free = [t for t in range(T) if t not in taken]
+    horizon = min(G - start, len(free))
+    if horizon <= 0:
+        return path
+
+    probs = win_prob[start:start + horizon][:, free]
+    eligible = pickable[start:start + horizon][:, free] & (probs > 0)
+    cost = np.where(eligible, -np.log(np.maximum(probs, MIN_WIN_PROB)), INELIGIBLE_COST)
+
+    rows, cols = linear_sum_assignment(cost)
+    for r, c in zip(rows, cols):
+        if eligible[r, c]:
+            path[start + r] = free[c]
+    return path
+
+def plan_for_users(state: Dict, tables) -> List[Dict]:
+    """Plans every user in a season state, solving once per distinct pick history."""
+    teams, team_idx, _, win_prob, pickable = tables
+    gw_ids = state["gameweeks"]
+    G, T = win_prob.shape
+    win_prob_ext = np.concatenate([win_prob, np.zeros((G, 1))], axis=1)
+
+    planned = {}
+    results = []
+    for u in state["users"]:
+        history = (tuple(u["used"]), u["current_pick"])
+        if history not in planned:
+            path = plan_path(set(u["used"]), u["current_pick"], team_idx, win_prob, pickable)
+            probs = win_prob_ext[np.arange(G), path]
+            planned[history] = {
+                "picks": [{
+                    "gameweek_id": gw,
+                    "team_name": teams[t] if t >= 0 else None,
+                    "win_probability": float(p),
+                } for gw, t, p in zip(gw_ids, path, probs)],
+                "survival_probability": float(probs.prod()) if G else 0.0,
+            }
+        results.append({"user_id": u["id"], "name": u["name"], **planned[history]})
+    return results
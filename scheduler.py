@@ -1,11 +1,14 @@
 import asyncio
 import logging
 import sys
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from sqlmodel import select, and_
 from database import SessionLocal, get_session
 from models import Fixture, Gameweek
 from services import sync_fixtures_logic
+from pick_queue import pick_queue
+import api_client
+from backup import backup_database, BACKUP_INTERVAL_HOURS
 
 from uvicorn.logging import DefaultFormatter
 
@@ -29,10 +32,13 @@ async def fixture_scheduler_worker():
             with SessionLocal() as session:
                 # Step 1: Run the sync
                 logger.info(f"{get_ts()} - scheduler - Starting fixture sync...")
+                # Live results read this week's picks, so queued ones must be written first
+                await pick_queue.flush()
                 sync_fixtures_logic(session)
                 
                 # Step 2: Determine next schedule
-                now = datetime.now(timezone.utc).replace(tzinfo=None)
+                # Follows the replay clock when replaying recorded API traffic
+                now = api_client.utcnow()
                 
                 # Rule B: Check if any match is currently "on"
                 # "On" means it has started, it's within the 150-min window, and it's not finished/postponed/cancelled
@@ -71,8 +77,24 @@ async def fixture_scheduler_worker():
                         logger.info(f"{get_ts()} - scheduler - No future fixtures found. Sleeping for 24 hours.")
                 
                 logger.info(f"{get_ts()} - scheduler - Worker sleeping for {round(next_run_seconds)} seconds")
-                await asyncio.sleep(next_run_seconds)
+                await asyncio.sleep(next_run_seconds / api_client.time_scale())
 
         except Exception as e:
             logger.error(f"{get_ts()} - scheduler - Error in scheduler worker: {e}", exc_info=True)
-            await asyncio.sleep(300) # Sleep 5 mins on error before retrying
+            await asyncio.sleep(300 / api_client.time_scale()) # Sleep 5 mins (on the replay clock) on error before retrying
+
+async def backup_scheduler_worker():
+    """
+    Background worker that takes a rotating online snapshot of the database
+    every BACKUP_INTERVAL_HOURS. The copy runs in a thread so the event loop keeps serving requests.
+    """
+    def get_ts():
+        return datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL_HOURS * 3600)
+        try:
+            path = await asyncio.to_thread(backup_database)
+            logger.info(f"{get_ts()} - backup - Snapshot written to {path}")
+        except Exception as e:
+            logger.error(f"{get_ts()} - backup - Error taking backup: {e}", exc_info=True)
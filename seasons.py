@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+from sqlalchemy import delete, func, insert, literal, update
+from sqlmodel import select
+from models import (
+    User, Season, SeasonCreate, Gameweek, Fixture, Pick,
+    ArchivedGameweek, ArchivedFixture, ArchivedPick, ArchivedStanding,
+)
+from services import pick_outcome
+import gameweek_cache
+
+ARCHIVE_CHUNK_SIZE = 1000
+
+def archive_season(session, next_season: SeasonCreate, force: bool = False) -> Dict:
+    """
+    Moves the active season's gameweeks, fixtures and picks into the archive
+    tables along with each player's final standing, empties the live tables and
+    starts next_season. Players are kept and reactivated with their re-entry
+    counts reset.
+
+    Refuses while any gameweek from the season's first one on is unprocessed,
+    unless force is set. Everything happens in one transaction.
+    """
+    context = gameweek_cache.get_context(session)
+    season = session.exec(select(Season).where(Season.is_active == True)).first()
+    if not season:
+        raise ValueError("No active season")
+    if next_season.first_gw_id < 1:
+        raise ValueError("first_gw_id must be a gameweek number")
+    if session.exec(select(Season).where(Season.name == next_season.name)).first():
+        raise ValueError(f"A season named {next_season.name} already exists")
+
+    unprocessed = [gw.id for gw in context.gameweeks.values() if gw.id >= season.first_gw_id and not gw.is_processed]
+    if unprocessed and not force:
+        raise ValueError(f"Season is not complete: gameweek {min(unprocessed)} has not been processed")
+
+    # Gameweeks and fixtures are copied as-is in the database
+    session.execute(insert(ArchivedGameweek).from_select(
+        ["season_id", "id", "deadline", "re_entry_allowed", "is_rollover"],
+        select(literal(season.id), Gameweek.id, Gameweek.deadline, Gameweek.re_entry_allowed, Gameweek.is_rollover)
+    ))
+    session.execute(insert(ArchivedFixture).from_select(
+        ["season_id", "id", "gameweek_id", "home_team", "away_team", "kickoff_time", "status", "home_score", "away_score", "winner"],
+        select(literal(season.id), Fixture.id, Fixture.gameweek_id, Fixture.home_team, Fixture.away_team, Fixture.kickoff_time,
+               Fixture.status, Fixture.home_score, Fixture.away_score, Fixture.winner)
+    ))
+
+    # Picks are stored with their final outcome so history needs no fixture lookups
+    pending: List[Dict] = []
+    picks_archived = 0
+    rows = session.exec(select(Pick.user_id, Pick.gameweek_id, Pick.team_name, Pick.timestamp)).all()
+    for user_id, gw_id, team_name, timestamp in rows:
+        gw = context.gameweeks.get(gw_id)
+        pending.append({
+            "season_id": season.id,
+            "user_id": user_id,
+            "gameweek_id": gw_id,
+            "team_name": team_name,
+            "outcome": pick_outcome(team_name, context.fixture_for(gw_id, team_name), gw) if gw else "Pending",
+            "timestamp": timestamp,
+        })
+        if len(pending) >= ARCHIVE_CHUNK_SIZE:
+            session.execute(insert(ArchivedPick), pending)
+            picks_archived += len(pending)
+            pending.clear()
+    if pending:
+        session.execute(insert(ArchivedPick), pending)
+        picks_archived += len(pending)
+
+    pick_stats = {
+        user_id: (count, last_gw)
+        for user_id, count, last_gw in session.exec(
+            select(Pick.user_id, func.count(), func.max(Pick.gameweek_id)).group_by(Pick.user_id)
+        ).all()
+    }
+    standings = []
+    for u in session.exec(select(User).where(User.is_admin == False)).all():
+        count, last_gw = pick_stats.get(u.id, (0, None))
+        standings.append({
+            "season_id": season.id,
+            "user_id": u.id,
+            "name": u.name,
+            "is_active": u.is_active,
+            "re_entries": u.number_of_re_entries,
+            "rollover_re_entries": u.number_of_rollover_re_entries,
+            "picks_made": count,
+            "last_gw_id": last_gw,
+        })
+    if standings:
+        session.execute(insert(ArchivedStanding), standings)
+
+    # Live tables only ever hold the active season
+    session.execute(delete(Pick))
+    session.execute(delete(Fixture))
+    session.execute(delete(Gameweek))
+    session.execute(update(User).values(is_active=True, number_of_re_entries=0, number_of_rollover_re_entries=0))
+
+    season.is_active = False
+    season.archived_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    session.add(season)
+    new_season = Season(name=next_season.name, first_gw_id=next_season.first_gw_id)
+    session.add(new_season)
+    session.commit()
+    gameweek_cache.invalidate()
+    session.refresh(new_season)
+
+    return {
+        "archived_season": {"id": season.id, "name": season.name},
+        "active_season": {"id": new_season.id, "name": new_season.name, "first_gw_id": new_season.first_gw_id},
+        "gameweeks": len(context.gameweeks),
+        "fixtures": len(context.all_fixtures()),
+        "picks": picks_archived,
+        "standings": len(standings),
+    }
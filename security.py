@@ -0,0 +1,42 @@
+import asyncio
+import hashlib
+import hmac
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+# Keys the lookup digest stored in User.pin. Must stay the same for the life of
+# the database: changing it makes every stored PIN unmatchable. There is no
+# default, since a known pepper lets anyone with the database brute-force PINs.
+PIN_PEPPER = os.getenv("PIN_PEPPER")
+if not PIN_PEPPER:
+    raise RuntimeError("PIN_PEPPER is not set; set it to a long random secret before starting")
+PIN_HASH_ROUNDS = int(os.getenv("PIN_HASH_ROUNDS", "10"))
+PIN_HASH_WORKERS = int(os.getenv("PIN_HASH_WORKERS", str(min(8, (os.cpu_count() or 1) + 1))))
+
+pwd_context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=PIN_HASH_ROUNDS)
+
+# bcrypt is CPU-bound; a dedicated pool keeps sign-in bursts off the event loop
+# without starving other to_thread work.
+_hash_executor = ThreadPoolExecutor(max_workers=PIN_HASH_WORKERS, thread_name_prefix="pin-hash")
+
+_LOOKUP_RE = re.compile(r"^[0-9a-f]{64}$")
+# Verified against when no user matches, so unknown PINs take as long as wrong ones
+_DUMMY_HASH = pwd_context.hash("00000")
+
+def pin_lookup(pin: str) -> str:
+    """Keyed digest of a PIN, stored in the indexed User.pin column for lookups."""
+    return hmac.new(PIN_PEPPER.encode(), pin.encode(), hashlib.sha256).hexdigest()
+
+def is_pin_lookup(value: str) -> bool:
+    return bool(value) and _LOOKUP_RE.match(value) is not None
+
+async def hash_pin(pin: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, pwd_context.hash, pin)
+
+async def verify_pin(pin: str, pin_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, pwd_context.verify, pin, pin_hash)
+
+async def verify_dummy(pin: str):
+    await verify_pin(pin, _DUMMY_HASH)
@@ -1,20 +1,61 @@
-from datetime import datetime, timedelta
-from sqlmodel import select, and_
-from database import get_session
-from models import User, Gameweek, Fixture, Pick
+from datetime import datetime
+from sqlmodel import select
+from models import User, Gameweek, Fixture, Pick, ArchivedFixture
 import api_client
+import gameweek_cache
+
+def pick_outcome(team_name, fixture, gw):
+    """Player-facing outcome of a pick given its fixture and gameweek."""
+    outcome = "Pending"
+    if fixture:
+        if fixture.status == 'FINISHED':
+            outcome = "WON" if fixture.winner == team_name else "LOST"
+        elif fixture.status in ['POSTPONED', 'CANCELLED']:
+            outcome = "THROUGH (Postponed)" if gw.is_processed else "POSTPONED"
+        elif fixture.status == 'IN_PLAY':
+            outcome = "In Play"
+    return outcome
+
+def get_used_teams(session, users, first_gw_id):
+    """
+    Batched version of the reuse rule in make_pick: maps user id to the set of teams
+    they have picked since the last rollover. Users with a re-entry may reuse
+    their pick from the first gameweek.
+    """
+    threshold = gameweek_cache.get_context(session).rollover_threshold
+    used = {u.id: set() for u in users}
+    exempt = {u.id for u in users if u.number_of_re_entries > 0}
+    query = select(Pick.user_id, Pick.gameweek_id, Pick.team_name).where(Pick.gameweek_id >= threshold)
+    if len(used) <= 500:
+        query = query.where(Pick.user_id.in_(list(used)))
+    rows = session.exec(query).all()
+    for user_id, gw_id, team_name in rows:
+        if user_id not in used:
+            continue
+        if user_id in exempt and gw_id == first_gw_id:
+            continue
+        used[user_id].add(team_name)
+    return used
 
 def sync_fixtures_logic(session):
-    """Core logic to fetch and update fixtures, and process live results."""
+    """
+    Core logic to fetch and update fixtures, and process live results.
+    Callers on the event loop must await pick_queue.flush() first so queued picks are counted.
+    """
     matches = api_client.get_pl_fixtures()
     
     current_gw_num = api_client.get_current_gameweek_number()
     
     # Check if a current gameweek already exists to avoid overriding it
-    existing_current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
+    existing_current_gw = gameweek_cache.get_context(session).current
+
+    # Until the API moves on to the new season it still reports the archived one
+    archived_ids = set(session.exec(select(ArchivedFixture.id)).all())
     
     # Update Gameweeks and Fixtures
     for m in matches:
+        if m['id'] in archived_ids:
+            continue
         gw_id = m['matchday']
         kickoff = datetime.fromisoformat(m['utcDate'].replace('Z', '+00:00')).replace(tzinfo=None)
         
@@ -72,9 +113,11 @@ def sync_fixtures_logic(session):
                     fix.winner = "DRAW"
     
     session.commit()
+    gameweek_cache.invalidate()
     
     # Live Processing
-    current_gw = session.exec(select(Gameweek).where(Gameweek.is_current == True)).first()
+    context = gameweek_cache.get_context(session)
+    current_gw = context.current
     if current_gw:
         picks = session.exec(select(Pick).where(Pick.gameweek_id == current_gw.id)).all()
         for pick in picks:
@@ -82,12 +125,7 @@ def sync_fixtures_logic(session):
             if not user or not user.is_active or user.is_admin:
                 continue
             
-            fixture = session.exec(select(Fixture).where(
-                and_(
-                    Fixture.gameweek_id == current_gw.id,
-                    (Fixture.home_team == pick.team_name) | (Fixture.away_team == pick.team_name)
-                )
-            )).first()
+            fixture = context.fixture_for(current_gw.id, pick.team_name)
             
             if fixture and fixture.status == 'FINISHED':
                 if fixture.winner != pick.team_name:
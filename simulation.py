@@ -0,0 +1,379 @@
+import hashlib
+import json
+import math
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from sqlmodel import select, and_
+from models import User, Pick
+from gameweek_cache import FixtureInfo
+from services import get_used_teams
+import gameweek_cache
+
+# Strength model defaults
+DEFAULT_DRAW_RATE = 0.25
+HOME_ADVANTAGE = 1.2
+PRIOR_GAMES = 3        # Pseudo-games pulling every team towards the league average
+PRIOR_PPG = 1.35       # Roughly the average points per game in the PL
+
+SIM_CHUNK = 512        # Simulations processed per vectorized batch
+PATH_SLOTS = 64        # Independently drawn pick paths per player; simulations cycle through them
+MAX_REDRAWS = 8        # Alias-table redraws before falling back to an exact pick draw
+EXACT_DRAW_CHUNK = 65536
+
+FINAL_STATUSES = ['FINISHED', 'POSTPONED', 'CANCELLED']
+
+def estimate_strengths(finished: List[FixtureInfo]) -> Tuple[Dict[str, float], float]:
+    """Points-per-game rating per team (shrunk towards the league average) and the observed draw rate."""
+    points: Dict[str, float] = {}
+    games: Dict[str, int] = {}
+    draws = 0
+    for f in finished:
+        if f.winner is None:
+            continue
+        for team in (f.home_team, f.away_team):
+            games[team] = games.get(team, 0) + 1
+            points.setdefault(team, 0)
+        if f.winner == "DRAW":
+            draws += 1
+            points[f.home_team] += 1
+            points[f.away_team] += 1
+        else:
+            points[f.winner] = points.get(f.winner, 0) + 3
+
+    strengths = {t: (points[t] + PRIOR_PPG * PRIOR_GAMES) / (games[t] + PRIOR_GAMES) for t in games}
+    total = sum(games.values()) // 2
+    draw_rate = draws / total if total else DEFAULT_DRAW_RATE
+    return strengths, draw_rate
+
+def fixture_probabilities(home: str, away: str, strengths: Dict[str, float], draw_rate: float) -> Tuple[float, float, float]:
+    """(home win, draw, away win) from the simple strength model."""
+    h = strengths.get(home, PRIOR_PPG) * HOME_ADVANTAGE
+    a = strengths.get(away, PRIOR_PPG)
+    share = h / (h + a) if (h + a) > 0 else 0.5
+    return (1 - draw_rate) * share, draw_rate, (1 - draw_rate) * (1 - share)
+
+def validate_overrides(overrides: Dict[int, Any]) -> Dict[int, Tuple[float, float, float]]:
+    """Normalizes [home, draw, away] overrides, raising ValueError for anything that is not a usable distribution."""
+    normalized = {}
+    for fixture_id, values in overrides.items():
+        if not isinstance(values, (list, tuple)) or len(values) != 3:
+            raise ValueError(f"Fixture {fixture_id}: expected [home, draw, away] probabilities")
+        try:
+            p = [float(x) for x in values]
+        except (TypeError, ValueError):
+            raise ValueError(f"Fixture {fixture_id}: probabilities must be numbers")
+        if not all(math.isfinite(x) and x >= 0 for x in p):
+            raise ValueError(f"Fixture {fixture_id}: probabilities must be non-negative")
+        total = sum(p)
+        if total <= 0:
+            raise ValueError(f"Fixture {fixture_id}: probabilities must not all be zero")
+        normalized[fixture_id] = tuple(x / total for x in p)
+    return normalized
+
+def load_season_state(session, first_gw_id: int, overrides: Optional[Dict[int, List[float]]] = None, user_id: Optional[int] = None) -> Optional[Dict]:
+    """
+    Snapshots everything the simulator needs into plain Python data so the
+    heavy lifting can run off the request thread without touching the session.
+    Pass user_id to load a single player instead of every active one.
+    Raises ValueError for malformed overrides.
+    """
+    overrides = validate_overrides(overrides) if overrides else {}
+    context = gameweek_cache.get_context(session)
+    current_gw = context.current
+    if not current_gw:
+        return None
+
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    gw_ids = [gw_id for gw_id, gw in sorted(context.gameweeks.items()) if gw_id >= current_gw.id and not gw.is_processed]
+
+    fixtures = sorted((f for gw_id in gw_ids for f in context.fixtures(gw_id)), key=lambda f: f.kickoff_time)
+    finished = [f for f in context.all_fixtures() if f.status == 'FINISHED']
+    strengths, draw_rate = estimate_strengths(finished)
+
+    user_query = select(User).where(and_(User.is_active == True, User.is_admin == False))
+    pick_query = select(Pick).where(Pick.gameweek_id == current_gw.id)
+    if user_id is not None:
+        user_query = user_query.where(User.id == user_id)
+        pick_query = pick_query.where(Pick.user_id == user_id)
+    users = session.exec(user_query).all()
+    used = get_used_teams(session, users, first_gw_id)
+    current_picks = {p.user_id: p.team_name for p in session.exec(pick_query).all()}
+    if not gw_ids or gw_ids[0] != current_gw.id:
+        current_picks = {}
+
+    # Once the current deadline passes no new picks can be made for that week
+    deadline_passed = now > current_gw.deadline
+
+    fixture_rows = []
+    for f in fixtures:
+        if f.status == 'FINISHED':
+            probs = (1.0, 0.0, 0.0) if f.winner == f.home_team else (0.0, 0.0, 1.0) if f.winner == f.away_team else (0.0, 1.0, 0.0)
+        elif f.id in overrides:
+            probs = overrides[f.id]
+        else:
+            probs = fixture_probabilities(f.home_team, f.away_team, strengths, draw_rate)
+        fixture_rows.append({
+            "id": f.id,
+            "gameweek_id": f.gameweek_id,
+            "home_team": f.home_team,
+            "away_team": f.away_team,
+            "probs": probs,
+            # Postponed/cancelled fixtures count as 'through' but cannot be newly picked
+            "void": f.status in ['POSTPONED', 'CANCELLED'],
+            "pickable": f.status not in FINAL_STATUSES and f.kickoff_time > now
+                        and not (deadline_passed and f.gameweek_id == current_gw.id),
+        })
+
+    return {
+        "current_gw_id": current_gw.id,
+        "gameweeks": gw_ids,
+        "fixtures": fixture_rows,
+        "users": [{
+            "id": u.id,
+            "name": u.name,
+            # The current week's pick is fixed, not a prior use
+            "used": sorted(used[u.id] - ({current_picks[u.id]} if u.id in current_picks else set())),
+            "current_pick": current_picks.get(u.id),
+        } for u in users],
+    }
+
+def build_tables(state: Dict):
+    """Indexes teams and fixtures per gameweek and precomputes each team's survival probability."""
+    teams = sorted({f["home_team"] for f in state["fixtures"]} | {f["away_team"] for f in state["fixtures"]})
+    team_idx = {t: i for i, t in enumerate(teams)}
+    gw_idx = {gw: i for i, gw in enumerate(state["gameweeks"])}
+    G, T = len(gw_idx), len(teams)
+
+    # First fixture per (gameweek, team), matching make_pick's `.first()`
+    team_fixture = np.full((G, T), -1, dtype=np.int32)
+    win_prob = np.zeros((G, T))
+    pickable = np.zeros((G, T), dtype=bool)
+    for i, f in enumerate(state["fixtures"]):
+        g = gw_idx[f["gameweek_id"]]
+        for t, p in ((team_idx[f["home_team"]], f["probs"][0]), (team_idx[f["away_team"]], f["probs"][2])):
+            if team_fixture[g, t] == -1:
+                team_fixture[g, t] = i
+                win_prob[g, t] = 1.0 if f["void"] else p
+                pickable[g, t] = f["pickable"]
+    return teams, team_idx, team_fixture, win_prob, pickable
+
+def _alias_table(weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Walker/Vose alias table for O(1) draws from a fixed discrete distribution."""
+    n = len(weights)
+    scaled = weights / weights.sum() * n
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1]
+    large = [i for i in range(n) if scaled[i] >= 1]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1 - scaled[s]
+        (small if scaled[l] < 1 else large).append(l)
+    return prob, alias
+
+def _sample_picks(rng, masks: np.ndarray, weights: np.ndarray, table) -> np.ndarray:
+    """
+    Draws one team per entry with probability proportional to `weights`, skipping
+    teams whose bit is set in that entry's mask. Returns -1 where nothing is left.
+    Draws come from an alias table shared by everyone and are redrawn when they
+    hit a used team; once most redraws miss, the rest get an exact draw.
+    """
+    T = len(weights)
+    picks = np.full(len(masks), -1, dtype=np.int64)
+    if table is None:
+        return picks
+    prob, alias = table
+    pending = np.arange(len(masks))
+    for _ in range(MAX_REDRAWS):
+        if not len(pending):
+            return picks
+        x = rng.random(len(pending)) * T
+        k = x.astype(np.int64)
+        t = np.where(x - k < prob[k], k, alias[k])
+        ok = ((masks[pending] >> t) & 1) == 0
+        picks[pending[ok]] = t[ok]
+        pending = pending[~ok]
+        if len(pending) > len(ok) // 2:
+            break
+    weights = weights.astype(np.float32)
+    for start in range(0, len(pending), EXACT_DRAW_CHUNK):
+        rows = pending[start:start + EXACT_DRAW_CHUNK]
+        used = np.unpackbits(masks[rows].astype("<i8").view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")[:, :T]
+        cum = np.cumsum((1 - used) * weights, axis=1)
+        r = rng.random(len(rows), dtype=np.float32) * cum[:, -1]
+        has = cum[:, -1] > 0
+        picks[rows[has]] = np.minimum((cum[has] < r[has, None]).sum(axis=1), T - 1)
+    return picks
+
+def sample_paths(rng, state: Dict, tables, n_paths: int) -> np.ndarray:
+    """
+    Draws n_paths pick paths per user: each remaining week's team is drawn from the
+    teams the user may still use, weighted by win probability, and never repeated
+    within the path. An existing pick for the current week is kept.
+    Returns team indices shaped (n_paths, users, gameweeks), -1 where no pick is left.
+    """
+    teams, team_idx, _, win_prob, pickable = tables
+    G, T = win_prob.shape
+    users = state["users"]
+    if T > 62:
+        raise ValueError("Too many teams for the pick bitmasks")
+
+    masks = np.zeros(len(users), dtype=np.int64)
+    current = np.full(len(users), -1, dtype=np.int64)
+    for i, u in enumerate(users):
+        for t in u["used"]:
+            if t in team_idx:
+                masks[i] |= 1 << team_idx[t]
+        if u["current_pick"] is not None:
+            current[i] = team_idx.get(u["current_pick"], -1)
+
+    weights = np.where(pickable & (win_prob > 0), win_prob, 0.0)
+    masks = np.tile(masks, n_paths)
+    current = np.tile(current, n_paths)
+    paths = np.empty((len(masks), G), dtype=np.int8)
+    for g in range(G):
+        table = _alias_table(weights[g]) if weights[g].sum() > 0 else None
+        picks = _sample_picks(rng, masks, weights[g], table)
+        if g == 0:
+            picks = np.where(current >= 0, current, picks)
+        paths[:, g] = picks
+        masks |= np.int64(1) << np.maximum(picks, 0)
+    return paths.reshape(n_paths, len(users), G)
+
+def _pack(bits: np.ndarray) -> np.ndarray:
+    """Packs a boolean array's last axis into little-endian uint64 words."""
+    pad = -bits.shape[-1] % 64
+    if pad:
+        bits = np.concatenate([bits, np.zeros(bits.shape[:-1] + (pad,), dtype=bool)], axis=-1)
+    return np.packbits(bits, axis=-1, bitorder="little").view("<u8")
+
+def run_simulation(state: Dict, n_sims: int = 100000, seed: Optional[int] = None) -> Dict:
+    """
+    Monte Carlo over the remaining fixtures with every player picking at random
+    (see sample_paths). Each player gets PATH_SLOTS independently drawn paths and
+    simulation s uses slot s % PATH_SLOTS, so players stay independent within a
+    run while the paths can be bit-packed: each slot keeps one bit per player and
+    a week's results knock players out with a handful of word-wide operations.
+    """
+    tables = build_tables(state)
+    teams, team_idx, team_fixture, win_prob, pickable = tables
+    G, T = win_prob.shape
+    gw_ids = state["gameweeks"]
+    fixtures = state["fixtures"]
+    users = state["users"]
+
+    if G == 0 or not fixtures or not users:
+        return {"n_simulations": 0, "gameweeks": gw_ids, "users": [], "rollover_probability": 0.0, "expected_rollover_gameweek": None}
+
+    rng = np.random.default_rng(seed)
+    U = len(users)
+    K = min(PATH_SLOTS, n_sims)
+    paths = sample_paths(rng, state, tables, K)  # (K, U, G)
+
+    # A path's survival is exact since fixtures in different weeks are independent
+    win_prob_ext = np.concatenate([win_prob, np.zeros((G, 1))], axis=1)
+    survival = sum(win_prob_ext[np.arange(G), np.where(p < 0, T, p)].prod(axis=1) for p in paths) / K
+
+    cum = np.array([np.cumsum(f["probs"]) for f in fixtures])
+    void = np.array([f["void"] for f in fixtures], dtype=bool)
+    fix_gw = np.array([gw_ids.index(f["gameweek_id"]) for f in fixtures])
+    home_idx = np.array([team_idx[f["home_team"]] for f in fixtures])
+    away_idx = np.array([team_idx[f["away_team"]] for f in fixtures])
+    # Only a team's first fixture of the week decides its pick
+    decides_home = team_fixture[fix_gw, home_idx] == np.arange(len(fixtures))
+    decides_away = team_fixture[fix_gw, away_idx] == np.arange(len(fixtures))
+
+    wins = np.zeros(U, dtype=np.int64)
+    rollover_at = np.zeros(G, dtype=np.int64)
+    split_at_end = 0
+
+    for k in range(K):
+        # (gameweek, team) -> players whose slot-k path picks that team that week
+        picked = _pack(paths[k].T[:, None, :] == np.arange(T)[None, :, None])  # (G, T, W)
+        W = picked.shape[-1]
+        # Per fixture, the players who survive on [draw, home win, away win, void]
+        survivors = np.zeros((len(fixtures), 4, W), dtype=np.uint64)
+        for i in range(len(fixtures)):
+            home = picked[fix_gw[i], home_idx[i]] if decides_home[i] else 0
+            away = picked[fix_gw[i], away_idx[i]] if decides_away[i] else 0
+            survivors[i, 1] = home
+            survivors[i, 2] = away
+            survivors[i, 3] = home | away
+        week_fixtures = [np.nonzero(fix_gw == g)[0] for g in range(G)]
+
+        slot_sims = len(range(k, n_sims, K))
+        done = 0
+        while done < slot_sims:
+            S = min(SIM_CHUNK, slot_sims - done)
+            done += S
+
+            u = rng.random((S, len(fixtures)))
+            result = ((u < cum[:, 0]) | void) * 1 + ((u >= cum[:, 1]) | void) * 2
+
+            alive = np.full((S, W), np.iinfo(np.uint64).max, dtype=np.uint64)
+            open_sims = np.arange(S)
+            for g in range(G):
+                through = np.zeros((len(open_sims), W), dtype=np.uint64)
+                for i in week_fixtures[g]:
+                    through |= survivors[i][result[open_sims, i]]
+                alive &= through
+
+                # Sole survivor wins; everyone out at once is a rollover.
+                # Fewer than two survivors means at most one non-zero word holding a power of two
+                nonzero = alive != 0
+                words = nonzero.sum(axis=1)
+                first = alive[np.arange(len(open_sims)), nonzero.argmax(axis=1)]
+                single = (words == 1) & ((first & (first - np.uint64(1))) == 0)
+                rollover_at[g] += int((words == 0).sum())
+                for s in np.nonzero(single)[0]:
+                    w = int(nonzero[s].argmax())
+                    wins[w * 64 + int(first[s]).bit_length() - 1] += 1
+
+                still_open = (words > 1) | ((words == 1) & ~single)
+                open_sims, alive = open_sims[still_open], alive[still_open]
+                if not len(open_sims):
+                    break
+
+            split_at_end += len(open_sims)
+
+    user_results = [{
+        "user_id": u["id"],
+        "name": u["name"],
+        "survival_probability": float(survival[i]),
+        "win_probability": float(wins[i] / n_sims),
+    } for i, u in enumerate(users)]
+    user_results.sort(key=lambda r: (-r["win_probability"], -r["survival_probability"]))
+
+    rollover_total = int(rollover_at.sum())
+    return {
+        "n_simulations": n_sims,
+        "gameweeks": gw_ids,
+        "users": user_results,
+        "rollover_probability": rollover_total / n_sims,
+        "rollover_probability_by_gameweek": {gw: float(c / n_sims) for gw, c in zip(gw_ids, rollover_at)},
+        "expected_rollover_gameweek": float(np.dot(gw_ids, rollover_at) / rollover_total) if rollover_total else None,
+        "shared_at_season_end_probability": split_at_end / n_sims,
+    }
+
+# --- Cache between syncs ---
+# Keyed on a hash of the loaded season state, so any sync, result or pick
+# that changes the inputs naturally misses the cache.
+
+_cache: Dict[str, Dict] = {}
+_cache_lock = threading.Lock()
+
+def cache_key(state: Dict, n_sims: int, seed: Optional[int]) -> str:
+    payload = json.dumps([state, n_sims, seed], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def get_cached_simulation(key: str) -> Optional[Dict]:
+    with _cache_lock:
+        return _cache.get(key)
+
+def store_simulation(key: str, result: Dict):
+    with _cache_lock:
+        _cache.clear()  # Only the latest season state is worth keeping
+        _cache[key] = result
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Point the app at a throwaway database before anything opens the real one
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'pick_queue.db')}"
+os.environ.setdefault("PIN_PEPPER", "test-pin-pepper")
+
+from sqlmodel import Session, select
+from database import init_db, engine
+from models import Pick
+import pick_queue
+from pick_queue import PickIngestQueue, PendingPick, PickFlushError, MAX_FLUSH_ATTEMPTS
+
+init_db()
+now = datetime.now()
+real_write_picks = pick_queue.write_picks
+
+# Stands in for a pick the database keeps rejecting, e.g. a foreign key failure
+BAD_USER = 99
+def failing_write_picks(batch):
+    if any(p.user_id == BAD_USER for p in batch):
+        raise Exception("simulated constraint failure")
+    real_write_picks(batch)
+pick_queue.write_picks = failing_write_picks
+
+def stored_users():
+    with Session(engine) as session:
+        return sorted(session.exec(select(Pick.user_id)).all())
+
+async def main():
+    queue = PickIngestQueue()
+    queue.submit(PendingPick(user_id=1, gameweek_id=24, team_name="Arsenal", received_at=now))
+    queue.submit(PendingPick(user_id=BAD_USER, gameweek_id=24, team_name="Chelsea", received_at=now))
+    queue.submit(PendingPick(user_id=2, gameweek_id=24, team_name="Everton", received_at=now))
+
+    # 1. A failing write makes flush() give up instead of retrying in place
+    try:
+        await asyncio.wait_for(queue.flush(), timeout=5)
+        print("Test 1 (Failed flush raises): FAIL")
+    except PickFlushError:
+        print("Test 1 (Failed flush raises): PASS")
+    except asyncio.TimeoutError:
+        print("Test 1 (Failed flush raises): FAIL (flush kept retrying)")
+    print(f"Test 2 (Failed picks kept queued): {'PASS' if len(queue._pending) == 3 and stored_users() == [] else 'FAIL'}")
+
+    # 2. Once the batch keeps failing the bad pick is set aside and the rest are written
+    for _ in range(MAX_FLUSH_ATTEMPTS - 2):
+        try:
+            await queue.flush()
+        except PickFlushError:
+            pass
+    await queue.flush()
+    print(f"Test 3 (Good picks written after repeated failures): {'PASS' if stored_users() == [1, 2] else 'FAIL'}")
+    print(f"Test 4 (Bad pick set aside): {'PASS' if [p.user_id for p in queue.failed] == [BAD_USER] and not queue._pending else 'FAIL'}")
+
+    # 3. Later picks are not held up
+    queue.submit(PendingPick(user_id=3, gameweek_id=24, team_name="Fulham", received_at=now + timedelta(seconds=1)))
+    await queue.flush()
+    print(f"Test 5 (Later picks go through): {'PASS' if stored_users() == [1, 2, 3] else 'FAIL'}")
+
+    # 4. A deleted user's queued pick is dropped, not written
+    queue.submit(PendingPick(user_id=4, gameweek_id=24, team_name="Brentford", received_at=now))
+    queue.drop_user(4)
+    await queue.flush()
+    print(f"Test 6 (Deleted user's pick dropped): {'PASS' if stored_users() == [1, 2, 3] else 'FAIL'}")
+
+asyncio.run(main())
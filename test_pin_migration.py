@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import tempfile
+
+# Point the app at a throwaway database before anything opens the real one
+db_path = os.path.join(tempfile.mkdtemp(), "pin_migration.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+os.environ.setdefault("PIN_PEPPER", "test-pin-pepper")
+
+# 1. A pre-upgrade user table with a plaintext PIN and no pin_hash column
+conn = sqlite3.connect(db_path)
+conn.execute("""
+    CREATE TABLE user (
+        id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, pin VARCHAR NOT NULL,
+        is_active BOOLEAN NOT NULL, is_admin BOOLEAN NOT NULL,
+        number_of_re_entries INTEGER NOT NULL, number_of_rollover_re_entries INTEGER NOT NULL
+    )
+""")
+conn.execute("INSERT INTO user VALUES (1, 'Test Player', '12345', 1, 0, 0, 0)")
+conn.commit()
+conn.close()
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from database import init_db, engine
+from models import User
+from security import pin_lookup
+import main
+
+# 2. Run the migrations the app runs on startup
+init_db()
+with Session(engine) as session:
+    user = session.get(User, 1)
+    print(f"Test 1 (Plaintext PIN replaced by lookup digest): {'PASS' if user.pin == pin_lookup('12345') else 'FAIL'}")
+    print(f"Test 2 (No bcrypt hash before first sign-in): {'PASS' if user.pin_hash is None else 'FAIL'}")
+
+client = TestClient(main.app)
+
+# 3. First sign-in with the old PIN hashes it
+res = client.post("/login", data={"username": "user", "password": "12345"})
+print(f"Test 3 (Sign in with migrated PIN): {'PASS' if res.status_code == 200 else 'FAIL'}")
+token = res.json().get("access_token")
+with Session(engine) as session:
+    pin_hash = session.get(User, 1).pin_hash
+    print(f"Test 4 (bcrypt hash stored on first sign-in): {'PASS' if pin_hash and pin_hash.startswith('$2') else 'FAIL'}")
+
+# 4. The hash is used from now on
+res = client.post("/login", data={"username": "user", "password": "12345"})
+print(f"Test 5 (Second sign-in verifies the hash): {'PASS' if res.status_code == 200 else 'FAIL'}")
+res = client.post("/login", data={"username": "user", "password": "54321"})
+print(f"Test 6 (Wrong PIN rejected): {'PASS' if res.status_code == 400 else 'FAIL'}")
+
+# 5. The token works until the PIN changes
+headers = {"Authorization": f"Bearer {token}"}
+res = client.get("/me", headers=headers)
+print(f"Test 7 (Token accepted): {'PASS' if res.status_code == 200 and res.json()['name'] == 'Test Player' else 'FAIL'}")
+with Session(engine) as session:
+    user = session.get(User, 1)
+    user.pin = pin_lookup("67890")
+    user.pin_hash = None
+    session.add(user)
+    session.commit()
+res = client.get("/me", headers=headers)
+print(f"Test 8 (Token revoked after PIN change): {'PASS' if res.status_code == 401 else 'FAIL'}")
@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import secrets
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from sqlalchemy import insert
+from sqlmodel import select
+from models import User
+from security import pin_lookup
+
+PIN_LENGTH = 5
+IMPORT_CHUNK_SIZE = 500
+
+def _parse_bool(value, default: bool) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+def iter_import_rows(stream, fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Lazily yields (line_number, row, error) from a binary upload stream.
+    Only one line is held in memory at a time, so large files are fine.
+    Raises ValueError for uploads that are not UTF-8 or not parseable CSV.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        yield from _iter_rows(text, fmt)
+    except UnicodeDecodeError:
+        raise ValueError("Upload is not valid UTF-8 text")
+
+def _iter_rows(text, fmt: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        try:
+            for row in reader:
+                yield reader.line_num, row, None
+        except csv.Error as e:
+            raise ValueError(f"Invalid CSV near line {reader.line_num + 1}: {e}")
+    elif fmt == "jsonl":
+        for line_num, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_num, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(row, dict):
+                yield line_num, None, "Each line must be a JSON object"
+                continue
+            yield line_num, row, None
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+def generate_unique_pin(taken: Set[str]) -> str:
+    """Draws random PINs until one is found whose lookup digest is not already in use."""
+    if len(taken) >= 10 ** PIN_LENGTH:
+        raise ValueError("No free PINs left")
+    while True:
+        pin = f"{secrets.randbelow(10 ** PIN_LENGTH):0{PIN_LENGTH}d}"
+        if pin_lookup(pin) not in taken:
+            return pin
+
+def import_users(session, stream, fmt: str, generate_pins: bool = False) -> Dict:
+    """
+    Bulk-creates users from a CSV/JSONL upload.
+    Rows need a `name` and, unless generate_pins is set, a `pin`.
+    PIN uniqueness is checked against a set of lookup digests loaded in a single
+    query and rows are written with chunked executemany inserts in one transaction.
+    bcrypt hashes are left for each user's first sign-in so large imports stay fast.
+    An unreadable upload raises ValueError before anything is committed.
+    """
+    taken_pins = set(session.exec(select(User.pin)).all())
+    report: List[Dict] = []
+    pending: List[Dict] = []
+    created = 0
+
+    def flush():
+        if pending:
+            session.execute(insert(User), pending)
+            pending.clear()
+
+    for line_num, row, error in iter_import_rows(stream, fmt):
+        if error:
+            report.append({"line": line_num, "status": "error", "error": error})
+            continue
+
+        name = str(row.get("name") or "").strip()
+        pin = str(row.get("pin") or "").strip()
+        if not name:
+            report.append({"line": line_num, "status": "error", "error": "Missing name"})
+            continue
+
+        if not pin:
+            if not generate_pins:
+                report.append({"line": line_num, "name": name, "status": "error", "error": "Missing PIN"})
+                continue
+            try:
+                pin = generate_unique_pin(taken_pins)
+            except ValueError as e:
+                report.append({"line": line_num, "name": name, "status": "error", "error": str(e)})
+                continue
+        elif not (pin.isdigit() and len(pin) == PIN_LENGTH):
+            report.append({"line": line_num, "name": name, "status": "error", "error": f"PIN must be {PIN_LENGTH} digits"})
+            continue
+        elif pin_lookup(pin) in taken_pins:
+            report.append({"line": line_num, "name": name, "status": "error", "error": "PIN already in use"})
+            continue
+
+        lookup = pin_lookup(pin)
+        taken_pins.add(lookup)
+        pending.append({
+            "name": name,
+            "pin": lookup,
+            "pin_hash": None,
+            "is_active": _parse_bool(row.get("is_active"), True),
+            "is_admin": False,
+            "number_of_re_entries": 0,
+            "number_of_rollover_re_entries": 0,
+        })
+        report.append({"line": line_num, "name": name, "status": "created", "pin": pin})
+        created += 1
+
+        if len(pending) >= IMPORT_CHUNK_SIZE:
+            flush()
+
+    flush()
+    session.commit()
+
+    return {
+        "created": created,
+        "errors": len(report) - created,
+        "rows": report
+    }